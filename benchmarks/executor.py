@@ -0,0 +1,239 @@
+""" Benchmark the overhead of pyforces' executor on reference programs.
+
+Each reference program is run many times through TraditionalExecutor (poll and no-poll),
+and also bare (spawned with stdout to /dev/null and reaped with wait4), which is the
+ground truth. Reported:
+    overhead: harness wall time per test minus the bare run's, i.e. the cost of
+        supervising, reading stdout, decoding and comparing
+    tests/s: throughput of the harness, one test at a time
+    time error: reported CPU time minus the CPU time the program is known to burn
+    memory error: reported peak minus the memory the program is known to touch
+Before that, an infinite loop is run under a short time limit, which must be reported as
+TLE in both modes, and leave no process behind (like a solution orphaned by its wrapper).
+
+Usage (Linux or macOS, needs g++):
+    python benchmarks/executor.py [--repeat 20] [--json results.json]
+Pass --json to save the results, and compare files across releases.
+"""
+from argparse import ArgumentParser
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+from pyforces.cf.build import build_cached
+from pyforces.cf.execute import TraditionalExecutor
+
+PROGRAMS = {
+    'noop': r"""
+int main() { return 0; }
+""",
+    'echo': r"""
+#include <cstdio>
+int main() {
+    static char buf[1 << 16];
+    size_t n;
+    while ((n = fread(buf, 1, sizeof buf, stdin)) > 0) fwrite(buf, 1, n, stdout);
+}
+""",
+    # Burn argv[1] ms of CPU time, measured by the program itself
+    'cpu': r"""
+#include <cstdio>
+#include <cstdlib>
+#include <ctime>
+int main(int argc, char **argv) {
+    double target = atoi(argv[1]) / 1000.0;
+    timespec ts;
+    volatile unsigned long x = 0;
+    do {
+        for (int i = 0; i < 100000; i++) x += i;
+        clock_gettime(CLOCK_PROCESS_CPUTIME_ID, &ts);
+    } while (ts.tv_sec + ts.tv_nsec / 1e9 < target);
+    puts("ok");
+}
+""",
+    # Allocate and touch argv[1] MB
+    'alloc': r"""
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+int main(int argc, char **argv) {
+    size_t size = (size_t)atoi(argv[1]) << 20;
+    char *p = (char *)malloc(size);
+    memset(p, 1, size);
+    printf("%s\n", p[size - 1] == 1 ? "ok" : "bad");
+}
+""",
+    'loop': r"""
+int main() { for (volatile int i = 0;; i++); }
+""",
+}
+
+
+def compile_programs(work_dir: Path) -> dict[str, str]:
+    executables = {}
+    for name, code in PROGRAMS.items():
+        source = work_dir / f"{name}.cpp"
+        source.write_text(code)
+        executables[name] = str(build_cached(source, flags=['-O2'], pch=False))
+    return executables
+
+def write_testcase(work_dir: Path, name: str, input: str | bytes, answer: str | bytes):
+    in_file = work_dir / f"{name}.in"
+    ans_file = work_dir / f"{name}.ans"
+    for path, content in ((in_file, input), (ans_file, answer)):
+        if isinstance(content, str):
+            content = content.encode()
+        path.write_bytes(content)
+    return in_file, ans_file
+
+def run_bare(args: list[str], in_file: Path) -> tuple[float, float]:
+    """ (wall time, cpu time) of one run with nothing but spawn and wait4. """
+    with in_file.open('rb') as fp_in:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        start = time.perf_counter()
+        pid = os.posix_spawn(args[0], args, os.environ, file_actions=[
+            (os.POSIX_SPAWN_DUP2, fp_in.fileno(), 0),
+            (os.POSIX_SPAWN_DUP2, devnull, 1),
+        ])
+        _, _, rusage = os.wait4(pid, 0)
+        wall = time.perf_counter() - start
+        os.close(devnull)
+    return wall, rusage.ru_utime + rusage.ru_stime
+
+def run_harness(args: list[str], in_file: Path, ans_file: Path, poll: bool):
+    """ (wall time, ExecuteResult) of one run through the executor. """
+    executor = TraditionalExecutor(args=args, time_limit=10, memory_limit=4 << 30)
+    start = time.perf_counter()
+    with in_file.open() as fp_in, ans_file.open() as fp_ans:
+        result = executor.execute(fp_in, fp_ans, poll)
+    wall = time.perf_counter() - start
+    assert result.passed, f"{args} failed: {result.reason}"
+    return wall, result
+
+def running(executable: str) -> list[int]:
+    """ Pids of the processes running executable, from /proc (empty without it). """
+    pids = []
+    for pid in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        try:
+            if pid.isdigit() and os.readlink(f'/proc/{pid}/exe') == executable:
+                pids.append(int(pid))
+        except OSError:
+            pass  # exited, or not ours
+    return pids
+
+def check_loop(args: str | list[str], in_file: Path, ans_file: Path, time_limit: float = 0.5):
+    """ Fail unless an infinite loop is a TLE, and is gone once it's reported. """
+    executable = args if isinstance(args, str) else args[0]
+    for poll in (True, False):
+        executor = TraditionalExecutor(args=args, time_limit=time_limit)
+        start = time.perf_counter()
+        with in_file.open() as fp_in, ans_file.open() as fp_ans:
+            result = executor.execute(fp_in, fp_ans, poll)
+        wall = time.perf_counter() - start
+        mode = 'poll' if poll else 'no_poll'
+        assert result.timeout, f"loop ({mode}) is not a TLE: {result.reason}"
+        survivors = running(executable)
+        assert not survivors, f"loop ({mode}) is still running as {survivors}"
+        print(f"loop {mode}: TLE after {wall:.2f}s, {result.reason}")
+
+def benchmark(args: list[str], in_file: Path, ans_file: Path, repeat: int,
+              true_cpu: float | None = None, true_memory: int | None = None) -> dict:
+    bare = [run_bare(args, in_file) for _ in range(repeat)]
+    bare_wall = statistics.median(wall for wall, _ in bare)
+    stats = {'bare_wall': bare_wall, 'bare_cpu': statistics.median(cpu for _, cpu in bare)}
+    for poll in (True, False):
+        runs = [run_harness(args, in_file, ans_file, poll) for _ in range(repeat)]
+        walls = [wall for wall, _ in runs]
+        mode = 'poll' if poll else 'no_poll'
+        stats[mode] = {
+            'wall': statistics.median(walls),
+            'overhead': statistics.median(walls) - bare_wall,
+            'tests_per_second': len(walls) / sum(walls),
+        }
+        if poll and true_cpu is not None:
+            errors = [result.execution_time - true_cpu for _, result in runs]
+            stats[mode]['time_error'] = statistics.median(errors)
+            stats[mode]['time_error_max'] = max(errors, key=abs)
+        peaks = [result.peak_memory for _, result in runs if result.peak_memory]
+        if peaks:
+            stats[mode]['peak_memory'] = statistics.median(peaks)
+            if true_memory is not None:
+                stats[mode]['memory_error'] = statistics.median(peaks) - true_memory
+    return stats
+
+def print_stats(name: str, stats: dict):
+    print(f"{name}: bare {stats['bare_wall']*1000:.2f}ms wall, "
+          f"{stats['bare_cpu']*1000:.2f}ms cpu")
+    for mode in ('poll', 'no_poll'):
+        s = stats[mode]
+        line = f"  {mode:8} overhead {s['overhead']*1000:8.2f}ms  " \
+            f"{s['tests_per_second']:7.1f} tests/s"
+        if 'time_error' in s:
+            line += f"  time error {s['time_error']*1000:+.2f}ms " \
+                f"(worst {s['time_error_max']*1000:+.2f}ms)"
+        if 'memory_error' in s:
+            line += f"  memory error {s['memory_error']/1024/1024:+.2f}MB"
+        elif 'peak_memory' in s:
+            line += f"  peak {s['peak_memory']/1024/1024:.2f}MB"
+        print(line)
+
+def main():
+    parser = ArgumentParser(description="Benchmark the overhead of pyforces' executor")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per program and mode")
+    parser.add_argument('--echo-mb', type=int, default=100, help="Size of the echo test")
+    parser.add_argument('--cpu-ms', type=int, default=500, help="CPU time of the cpu test")
+    parser.add_argument('--alloc-mb', type=int, default=256, help="Memory of the alloc test")
+    parser.add_argument('--json', type=Path, help="Save the results to this file")
+    args = parser.parse_args()
+
+    results = {'python': sys.version, 'platform': platform.platform(), 'benchmarks': {}}
+    try:
+        from importlib.metadata import version
+        results['pyforces'] = version('pyforces-cli')
+    except Exception:
+        results['pyforces'] = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        executables = compile_programs(work_dir)
+
+        in_file, ans_file = write_testcase(work_dir, 'loop', '', '')
+        check_loop([executables['loop']], in_file, ans_file)
+        check_loop(executables['loop'], in_file, ans_file)  # a string, like a compiled solution
+
+        in_file, ans_file = write_testcase(work_dir, 'noop', '', '')
+        noop = benchmark([executables['noop']], in_file, ans_file, args.repeat,
+                         true_cpu=0)
+        print_stats('noop', noop)
+
+        line = '1234567890 ' * 9 + '\n'  # 100 bytes
+        content = line * (args.echo_mb * 1024 * 1024 // len(line))
+        in_file, ans_file = write_testcase(work_dir, 'echo', content, content)
+        del content
+        echo = benchmark([executables['echo']], in_file, ans_file, max(args.repeat // 4, 1))
+        print_stats(f'echo {args.echo_mb}MB', echo)
+
+        in_file, ans_file = write_testcase(work_dir, 'ok', '', 'ok\n')
+        cpu = benchmark([executables['cpu'], str(args.cpu_ms)], in_file, ans_file,
+                        args.repeat, true_cpu=args.cpu_ms / 1000)
+        print_stats(f'cpu {args.cpu_ms}ms', cpu)
+
+        alloc = benchmark([executables['alloc'], str(args.alloc_mb)], in_file, ans_file,
+                          args.repeat, true_memory=args.alloc_mb << 20)
+        print_stats(f'alloc {args.alloc_mb}MB', alloc)
+
+    results['benchmarks'] = {'noop': noop, 'echo': echo, 'cpu': cpu, 'alloc': alloc}
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=4))
+        print(f"Saved results to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
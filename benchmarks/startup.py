@@ -0,0 +1,148 @@
+""" Benchmark the startup time of pyforces' offline subcommands, and guard the budget.
+
+For each subcommand, a fresh interpreter runs pyforces' main() with the subcommand's
+arguments, in an empty directory and a fresh home: parsing the arguments, setting up
+logging, loading the config and importing the subcommand, with only its do_* function
+replaced by a no-op. That's everything that runs before its own work starts.
+
+The budget applies to the part beyond the stdlib floor: an interpreter that only imports
+the standard modules every subcommand needs anyway (argparse, logging, pathlib, json,
+dataclasses, subprocess, ...). The floor alone is ~55ms beyond a bare interpreter on
+CPython 3.11 on a 1-CPU Linux VM, so a total budget of 50ms can't be met by any
+pyforces; what pyforces adds on top of it (its own modules, main(), and any stdlib it
+pulls in beyond the floor) measured 0-40ms there, hence --budget-ms 50.
+Times are the minimum over the runs, the least disturbed by other processes; medians
+moved by +-20ms from one invocation to the next on the same machine.
+Reported:
+    startup: wall time of the whole process, beyond a bare interpreter and beyond the
+        stdlib floor, which is what the budget applies to
+    imports: the part spent importing, from -X importtime
+    slowest: the imports with the largest self time, to know what to make lazy
+Fails (exit code 1) if a subcommand is over --budget-ms, or imports one of the modules
+that only the online subcommands (parse, race, submit) need.
+
+Usage:
+    python benchmarks/startup.py [--repeat 20] [--budget-ms 50] [--json results.json]
+"""
+from argparse import ArgumentParser
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).absolute().parent.parent
+
+# Subcommand -> (its arguments, the module main() imports to run it, its function)
+SUBCOMMANDS = {
+    'test': (['test', '-f', 'a.py'], 'pyforces.cmd.test', 'do_test'),
+    'test --watch': (['test', '--watch', '-f', 'a.py'], 'pyforces.cmd.watch', 'do_watch'),
+    'stress': (['stress', '-f', 'a.py', '-g', 'gen.py', '-b', 'brute.py'],
+               'pyforces.cmd.stress', 'do_stress'),
+    'tests': (['tests'], 'pyforces.cmd.tests', 'do_tests'),
+    'calibrate': (['calibrate'], 'pyforces.cmd.calibrate', 'do_calibrate'),
+    'gen': (['gen'], 'pyforces.cmd.gen', 'do_gen'),
+}
+
+# Standard modules that every offline subcommand needs, their import time isn't pyforces'
+STDLIB_FLOOR = [
+    'argparse', 'logging', 'pathlib', 'json', 'dataclasses', 'typing', 're', 'enum',
+    'subprocess', 'threading', 'concurrent.futures', 'hashlib',
+]
+
+# Heavy modules of the web client, must not be imported by the offline subcommands
+FORBIDDEN = [
+    'pyforces.client', 'cloudscraper', 'requests', 'lxml', 'markdownify', 'websocket',
+    'countdown', 'webbrowser', 'importlib.metadata',
+]
+
+
+def run_python(code: str, work_dir: Path, importtime: bool = False) -> tuple[float, str]:
+    """ (wall time, stderr) of a fresh interpreter running code in work_dir, which is also
+    its home, so that it starts from the default config.
+    """
+    env = dict(os.environ, HOME=str(work_dir), USERPROFILE=str(work_dir),
+               PYTHONPATH=os.pathsep.join(
+                   filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])))
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # an installed pyforces has its .pyc files
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    proc = subprocess.run(args, env=env, cwd=work_dir, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True, check=True)
+    return time.perf_counter() - start, proc.stderr
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """ module -> (self us, cumulative us) from -X importtime output. """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def benchmark(argv: list[str], module: str, function: str, repeat: int, baseline: float,
+              floor: float, work_dir: Path) -> dict:
+    code = (f"import sys; sys.argv = {['pyforces'] + argv!r}\n"
+            f"import {module}; {module}.{function} = lambda *args: None\n"
+            f"from pyforces.cmd.main import main; main()")
+    run_python(code, work_dir)  # write the .pyc files and the config first
+    walls = [run_python(code, work_dir)[0] for _ in range(repeat)]
+    _, stderr = run_python(code, work_dir, importtime=True)
+    imported = parse_importtime(stderr)
+    slowest = sorted(imported.items(), key=lambda item: item[1][0], reverse=True)[:5]
+    return {
+        'startup': min(walls),
+        'interpreter': baseline,
+        'stdlib_floor': floor,
+        'imports': sum(us for us, _ in imported.values()) / 1e6,
+        'forbidden': [m for m in FORBIDDEN if m in imported],
+        'slowest': {name: us / 1e6 for name, (us, _) in slowest},
+    }
+
+def main():
+    parser = ArgumentParser(description="Benchmark the startup time of pyforces")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per subcommand")
+    parser.add_argument('--budget-ms', type=float, default=50,
+                        help="Maximum startup time beyond the stdlib floor")
+    parser.add_argument('--json', type=Path, help="Save the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        baseline = min(run_python('pass', work_dir)[0] for _ in range(args.repeat))
+        floor = min(run_python(f"import {', '.join(STDLIB_FLOOR)}", work_dir)[0]
+                    for _ in range(args.repeat))
+        print(f"bare interpreter: {baseline*1000:.2f}ms, "
+              f"stdlib floor: {floor*1000:.2f}ms (+{(floor - baseline)*1000:.2f}ms)")
+        results = {'python': sys.version, 'platform': platform.platform(),
+                   'budget': args.budget_ms / 1000, 'benchmarks': {}}
+        for name, (argv, module, function) in SUBCOMMANDS.items():
+            results['benchmarks'][name] = benchmark(argv, module, function, args.repeat,
+                                                    baseline, floor, work_dir)
+
+    failed = False
+    for name, stats in results['benchmarks'].items():
+        own = stats['startup'] - floor
+        over = own * 1000 > args.budget_ms
+        print(f"{name}: startup {stats['startup']*1000:.2f}ms "
+              f"(+{(stats['startup'] - baseline)*1000:.2f}ms, floor +{own*1000:.2f}ms), "
+              f"imports {stats['imports']*1000:.2f}ms", "(OVER BUDGET)" if over else "")
+        print("  slowest: " + ", ".join(
+            f"{module} {t*1000:.2f}ms" for module, t in stats['slowest'].items()))
+        if stats['forbidden']:
+            print(f"  imports {', '.join(stats['forbidden'])}, which it doesn't need")
+        failed = failed or over or bool(stats['forbidden'])
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=4))
+        print(f"Saved results to {args.json}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,6 @@
-from importlib.metadata import version
-
-__version__ = version('pyforces-cli')
+def __getattr__(name: str):
+    # importlib.metadata takes tens of milliseconds to import, only pay for it when asked
+    if name == '__version__':
+        from importlib.metadata import version
+        return version('pyforces-cli')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
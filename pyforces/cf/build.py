@@ -0,0 +1,221 @@
+import hashlib
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from logging import getLogger
+from pathlib import Path
+
+logger = getLogger(__name__)
+
+CACHE_DIR = Path.home() / '.pyforces' / 'cache'
+PCH_HEADER = 'bits/stdc++.h'
+CANCEL_POLL = 0.05  # seconds between checks whether a compilation is cancelled
+# Least recently used builds and precompiled headers are evicted beyond this, checked after
+# each compilation
+MAX_CACHE_BYTES = 1 << 30
+STALE_TMP = 3600  # seconds, older temp files were left by killed builds, not in progress
+
+def file_hash(path: Path) -> str:
+    """ Sha256 of a file's content, read in chunks. """
+    h = hashlib.sha256()
+    with path.open('rb') as fp:
+        while chunk := fp.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+def flags_hash(compiler: str, flags: list[str]) -> str:
+    return hashlib.sha256('\0'.join([compiler] + flags).encode()).hexdigest()
+
+def local_headers(depfile: Path, source: Path) -> list[str]:
+    """ The headers in the source's directory that it includes, like testlib.h, from the
+    make rule written by -MD. System headers are left out, they're part of the compiler.
+    """
+    rule = depfile.read_text().replace('\\\n', ' ')
+    deps = re.findall(r'(?:\\ |\S)+', rule.split(': ', 1)[1])
+    source_dir = source.parent.absolute()
+    headers = set()
+    for dep in deps:
+        path = Path(dep.replace('\\ ', ' ')).absolute()
+        if path.is_relative_to(source_dir) and path != source.absolute():
+            headers.add(str(path))
+    return sorted(headers)
+
+def headers_key(base: str, headers: list[str]) -> str | None:
+    """ The cache key of a build from base (source and flags) and the content of the local
+    headers it includes, None if one of them is gone.
+    """
+    h = hashlib.sha256(base.encode())
+    for header in headers:
+        try:
+            h.update(f"{header}\0{file_hash(Path(header))}".encode())
+        except FileNotFoundError:
+            return None
+    return h.hexdigest()
+
+def uses_bits_stdcpp(source: Path) -> bool:
+    return PCH_HEADER.encode() in source.read_bytes()
+
+def precompiled_header_dir(compiler: str, flags: list[str]) -> Path | None:
+    """ A directory holding bits/stdc++.h.gch precompiled with exactly these flags, to put
+    first in the include path. It's shared by all sources compiled with the same flags,
+    and built on first use. Return None if the compiler isn't GCC or precompiling fails.
+    """
+    if 'g++' not in Path(compiler).name:
+        return None  # clang wants -include-pch, and a matching header path
+    pch_dir = CACHE_DIR / 'pch' / flags_hash(compiler, flags)
+    gch = pch_dir / (PCH_HEADER + '.gch')
+    if gch.is_file():
+        gch.touch()  # used, for eviction
+        return pch_dir
+
+    gch.parent.mkdir(parents=True, exist_ok=True)
+    # The wrapper is outside pch_dir, so its include finds the real header
+    wrapper = CACHE_DIR / 'pch' / 'stdc++.h'
+    if not wrapper.is_file():
+        wrapper.write_text(f"#include <{PCH_HEADER}>\n")
+    tmp_gch = gch.with_name(f"{gch.name}.{os.getpid()}.tmp")
+    cmd = [compiler, *flags, '-x', 'c++-header', str(wrapper), '-o', str(tmp_gch)]
+    print(f"Precompiling <{PCH_HEADER}>, only once for these flags...")
+    logger.info("Precompiling: %s", ' '.join(cmd))
+    if subprocess.run(cmd).returncode:
+        logger.warning("Failed to precompile <%s>, compiling without it", PCH_HEADER)
+        tmp_gch.unlink(missing_ok=True)
+        return None
+    os.replace(tmp_gch, gch)
+    return pch_dir
+
+def evict_cache(keep: list[Path]):
+    """ Remove the least recently used builds (executables and .deps files) and precompiled
+    headers while the cache is over MAX_CACHE_BYTES, the files' mtime being their last use.
+    The paths in keep, like the build just made, are never removed.
+    """
+    entries = []  # (last use, size, path)
+    now = time.time()
+    for path in [*(CACHE_DIR / 'build').iterdir(),
+                 *(CACHE_DIR / 'pch').glob('*/' + PCH_HEADER + '.gch')]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:  # renamed or evicted by another pyforces
+            continue
+        if path.suffix in ('.tmp', '.d') and now - st.st_mtime < STALE_TMP:
+            continue
+        if path.suffix == '.gch':
+            path = path.parent.parent  # the whole precompiled header dir
+        # At least a block, so that the (often empty) .deps files don't pile up for free
+        entries.append((st.st_mtime, max(st.st_size, 4096), path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= MAX_CACHE_BYTES:
+            break
+        if path in keep:
+            continue
+        logger.info("Evicting %s from the build cache", path)
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+        total -= size
+
+def run_compiler(cmd: list[str], cancel: threading.Event | None = None):
+    """ Run the compiler, and once cancel is set, kill it along with its children (cc1plus,
+    as, ld). Raise CalledProcessError if it fails or is cancelled.
+    """
+    if cancel is None:
+        subprocess.run(cmd, check=True)
+        return
+    with subprocess.Popen(cmd, start_new_session=True) as proc:
+        try:
+            while not cancel.is_set():
+                try:
+                    proc.wait(CANCEL_POLL)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+        finally:
+            if proc.poll() is None:
+                logger.info("Killing the compiler")
+                if os.name == 'posix':
+                    os.killpg(proc.pid, signal.SIGKILL)
+                else:
+                    proc.kill()
+                proc.wait()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+def build_cached(
+    source: Path,
+    compiler: str = 'g++',
+    flags: list[str] | None = None,
+    pch: bool = True,
+    cancel: threading.Event | None = None,
+) -> Path:
+    """ Compile a C++ source into the build cache, and return the path of the executable.
+    The executable is named by the hash of source content, compiler, flags and the local
+    headers it includes (listed in <hash of the rest>.deps, from -MD), so an unchanged source
+    is compiled only once. If pch and the source includes bits/stdc++.h, compile with a
+    shared precompiled header. After compiling, the cache is trimmed to MAX_CACHE_BYTES.
+    Raise CalledProcessError if compilation fails, or is cancelled by setting cancel.
+    """
+    flags = flags if flags is not None else ['-O2', '-std=c++17']
+    h = hashlib.sha256()
+    h.update(source.read_bytes())
+    h.update(flags_hash(compiler, flags).encode())
+    base = h.hexdigest()
+    build_dir = CACHE_DIR / 'build'
+    suffix = '.exe' if os.name == 'nt' else ''
+    deps_file = build_dir / f"{base}.deps"
+    try:
+        key = headers_key(base, deps_file.read_text().splitlines())
+    except FileNotFoundError:
+        key = None
+    if key and (executable := build_dir / (key + suffix)).is_file():
+        logger.info('Using cached build "%s" of "%s"', executable, source)
+        executable.touch()  # used, for eviction
+        deps_file.touch()
+        return executable
+
+    include_flags = [f"-I{source.parent.absolute()}"]
+    pch_dir = None
+    if pch and uses_bits_stdcpp(source):
+        pch_dir = precompiled_header_dir(compiler, flags)
+        if pch_dir:
+            include_flags.insert(0, f"-I{pch_dir}")
+    build_dir.mkdir(parents=True, exist_ok=True)
+    # Compile to a temp name and rename, so that concurrent builds never see a partial file
+    tmp = build_dir / f"{base}.{os.getpid()}.tmp"
+    tmp_depfile = tmp.with_suffix('.d')
+    cmd = [compiler, *flags, *include_flags, '-MD', '-MF', str(tmp_depfile),
+           str(source), '-o', str(tmp)]
+    logger.info("Compiling: %s", ' '.join(cmd))
+    try:
+        run_compiler(cmd, cancel)
+        headers = local_headers(tmp_depfile, source)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        tmp_depfile.unlink(missing_ok=True)
+    executable = build_dir / (headers_key(base, headers) + suffix)
+    os.replace(tmp, executable)
+    tmp_deps = tmp.with_suffix('.deps')
+    tmp_deps.write_text(''.join(header + '\n' for header in headers))
+    os.replace(tmp_deps, deps_file)
+    evict_cache([executable, deps_file, pch_dir])
+    return executable
+
+def program_args(path: Path, cancel: threading.Event | None = None) -> list[str]:
+    """ Args to run a helper program (checker, interactor, etc.) given as source or executable.
+    .cpp files are compiled with build_cached, .py files are run by the current interpreter.
+    """
+    match path.suffix:
+        case '.cpp':
+            return [str(build_cached(path, cancel=cancel))]
+        case '.py':
+            return [sys.executable, str(path.absolute())]
+        case _:
+            return [str(path.absolute())]
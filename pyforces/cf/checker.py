@@ -0,0 +1,58 @@
+import subprocess
+import threading
+from logging import getLogger
+from pathlib import Path
+
+from pyforces.cf.build import program_args
+
+logger = getLogger(__name__)
+
+# testlib exit codes
+CHECKER_VERDICTS = {
+    0: "Passed",
+    1: "Wrong answer",
+    2: "Presentation error",
+    3: "Checker failed",
+    7: "Partially correct",
+}
+
+# The checker may run this many times the solution's time limit, it's usually much faster
+CHECKER_TIME_FACTOR = 5
+
+class Checker:
+    """ A testlib-style checker, run as `checker <input> <output> <answer>`.
+    Exit code 0 means accepted, and the message is read from stderr.
+    """
+
+    def __init__(self, args: list[str]):
+        self.args = args
+
+    @classmethod
+    def from_file(cls, path: Path, cancel: threading.Event | None = None):
+        """ Init a checker from a source file or executable.
+        .cpp files are compiled once and cached by content hash (testlib.h may be placed next
+        to the source), .py files are run by the current interpreter.
+        """
+        return cls(program_args(path, cancel))
+
+    def check(self, input_file: Path, output_file: Path, answer_file: Path,
+              timeout: float | None = None) -> tuple[bool, str]:
+        """ Run the checker, killing it after timeout seconds. Return (passed, reason) """
+        try:
+            proc = subprocess.run(
+                self.args + [str(input_file), str(output_file), str(answer_file)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            logger.info("Checker timed out after %.2fs", timeout)
+            return False, f"{CHECKER_VERDICTS[3]}: timed out after {timeout:.2f}s"
+        message = (proc.stderr or proc.stdout).strip()
+        logger.info("Checker exited with code %d: %s", proc.returncode, message)
+        if proc.returncode == 0:
+            return True, "Passed"
+        verdict = CHECKER_VERDICTS.get(proc.returncode, f"Checker exited with code {proc.returncode}")
+        return False, f"{verdict}: {message}" if message else verdict
@@ -0,0 +1,369 @@
+from bisect import bisect_right
+from collections import Counter
+from enum import Enum
+import re
+from itertools import compress, count, islice, zip_longest
+from logging import getLogger
+from math import isfinite
+from operator import ne
+from typing import BinaryIO, Iterator, TextIO
+
+logger = getLogger(__name__)
+
+class CompareMode(Enum):
+    LINES = 'lines'  # default, line by line
+    TOKENS = 'tokens'  # whitespace-insensitive, token by token
+    FLOAT = 'float'  # token by token, numbers within absolute or relative error
+    UNORDERED = 'unordered'  # lines as a multiset, order-insensitive
+
+LINE_PIECE_SIZE = 1 << 20  # characters (or bytes) of a line read at once
+TOKEN_BATCH_SIZE = 1 << 16
+TOKEN_CHUNK_SIZE = 1 << 20  # characters (or bytes) read at once
+
+TOKEN_PATTERN = re.compile(r'\S+')
+TOKEN_PATTERN_BYTES = re.compile(rb'\S+')
+
+YES_NO_PATTERN = re.compile(r'\b(yes|no)\b', flags=re.IGNORECASE)
+YES_NO_PATTERN_BYTES = re.compile(rb'\b(yes|no)\b', flags=re.IGNORECASE)
+# A short word at the end, that may be a "yes" or "no" cut by the end of a piece
+SHORT_WORD_END_PATTERN = re.compile(r'(?<!\w)\w{1,3}\Z')
+SHORT_WORD_END_PATTERN_BYTES = re.compile(rb'(?<!\w)\w{1,3}\Z')
+
+def fold_yes_no(line: str | bytes) -> str | bytes:
+    """ Lowercase every "yes" and "no" word, Codeforces accepts them in any case. """
+    pattern = YES_NO_PATTERN_BYTES if isinstance(line, bytes) else YES_NO_PATTERN
+    return pattern.sub(lambda m: m.group(1).lower(), line)
+
+def shorten(s: str | bytes, width: int = 50) -> str:
+    """ Shorten a string for error messages, decoding it if it's bytes. """
+    if isinstance(s, bytes):
+        s = s[:width].decode(errors='replace')
+    return s if len(s) <= width else s[:width-3] + '...'
+
+def describe_line_difference(ln: int, line_out: str | bytes, line_ans: str | bytes) -> str:
+    """ Locate the first differing token of two different lines. """
+    tokens_out = line_out.split()
+    tokens_ans = line_ans.split()
+    for tn, (tok_out, tok_ans) in enumerate(zip_longest(tokens_out, tokens_ans)):
+        if tok_out != tok_ans:
+            return (f"Expected {shorten(tok_ans) if tok_ans is not None else 'end of line'} "
+                    f"on line {ln} token {tn+1}, "
+                    f"found {shorten(tok_out) if tok_out is not None else 'end of line'}")
+    # Same tokens, different whitespace
+    return f"Expected {shorten(line_ans)} on line {ln}, found {shorten(line_out)}"
+
+def compare_output(
+    output: TextIO | BinaryIO,
+    answer: TextIO | BinaryIO,
+    mode: CompareMode = CompareMode.LINES,
+    abs_eps: float = 1e-6,
+    rel_eps: float = 1e-6,
+) -> tuple[bool, str]:
+    """ Compare output with answer according to mode.
+    Return (passed, reason if not passed). abs_eps and rel_eps are only used in float mode.
+    Both are text streams, or both binary streams, which are compared as bytes and only
+    decoded to describe a difference.
+    """
+    match mode:
+        case CompareMode.LINES:
+            return compare_lines(output, answer)
+        case CompareMode.TOKENS:
+            return compare_tokens(output, answer)
+        case CompareMode.FLOAT:
+            return compare_tokens(output, answer, abs_eps=abs_eps, rel_eps=rel_eps)
+        case CompareMode.UNORDERED:
+            return compare_unordered_lines(output, answer)
+    raise ValueError(f"Unknown compare mode {mode}")
+
+def is_line_end(piece: str | bytes) -> bool:
+    """ Whether a readline(LINE_PIECE_SIZE) read to the end of the line. """
+    return len(piece) < LINE_PIECE_SIZE or piece[-1:] in ('\n', b'\n')
+
+def long_line_pieces(first: str | bytes, stream: TextIO | BinaryIO
+                     ) -> Iterator[str | bytes]:
+    """ A line read in pieces of LINE_PIECE_SIZE, starting with first and reading the rest
+    from stream, with trailing whitespaces stripped and "yes"/"no" folded as in
+    compare_lines. Whitespaces and a short word at the end of a piece are carried over to
+    the next, as they may be trailing or part of a "yes".
+    """
+    pattern = SHORT_WORD_END_PATTERN_BYTES if isinstance(first, bytes) else \
+        SHORT_WORD_END_PATTERN
+    carry = previous = first[:0]  # previous: the last character yielded, for \b
+    piece = first
+    while True:
+        text = carry + piece
+        end = is_line_end(piece)
+        if end:
+            text, carry = text.rstrip(), text[:0]
+        else:
+            cut = len(text.rstrip())
+            # The last 4 characters hold a short word and the one before it
+            if cut == len(text) and (m := pattern.search(text[-4:])):
+                cut -= len(m.group())
+            text, carry = text[:cut], text[cut:]
+        if text:
+            yield fold_yes_no(previous + text)[len(previous):]
+            previous = text[-1:]
+        if end:
+            return
+        piece = stream.readline(LINE_PIECE_SIZE)
+
+def compare_long_line(ln: int, line_out: str | bytes, line_ans: str | bytes,
+                      output: TextIO | BinaryIO, answer: TextIO | BinaryIO) -> str | None:
+    """ Compare line ln, of which at least one side is longer than LINE_PIECE_SIZE, piece by
+    piece. Return the reason if they differ, None if not, then both are read up to the end
+    of the line.
+    """
+    pieces_out = long_line_pieces(line_out, output)
+    pieces_ans = long_line_pieces(line_ans, answer)
+    rest_out = rest_ans = line_out[:0]
+    column = 0  # characters compared so far
+    while True:
+        if not rest_out:
+            rest_out = next(pieces_out, None)
+        if not rest_ans:
+            rest_ans = next(pieces_ans, None)
+        if rest_out is None or rest_ans is None:
+            break
+        k = min(len(rest_out), len(rest_ans))
+        if rest_out[:k] != rest_ans[:k]:
+            i = next(i for i in range(k) if rest_out[i:i+1] != rest_ans[i:i+1])
+            return (f"Expected {shorten(rest_ans[i:])} on line {ln} column {column+i+1}, "
+                    f"found {shorten(rest_out[i:])}")
+        rest_out, rest_ans = rest_out[k:], rest_ans[k:]
+        column += k
+    if rest_out is not None:
+        return f"Expected end of line {ln} after column {column}, found {shorten(rest_out)}"
+    if rest_ans is not None:
+        return f"Expected {shorten(rest_ans)} on line {ln} column {column+1}, found end of line"
+    return None
+
+def compare_lines(output: TextIO | BinaryIO, answer: TextIO | BinaryIO) -> tuple[bool, str]:
+    """ Compare output with answer. Return (passed, reason if not passed)
+    Both are read line by line, and lines longer than LINE_PIECE_SIZE piece by piece, so the
+    memory use is bounded no matter how big the output is, and reading stops at the first
+    difference.
+    Trailing whitespaces of each line and trailing empty lines are ignored, and "yes"/"no"
+    are compared case-insensitively.
+    """
+    ln = 0
+    while True:
+        line_out = output.readline(LINE_PIECE_SIZE)
+        line_ans = answer.readline(LINE_PIECE_SIZE)
+        if not line_out or not line_ans:
+            break
+        ln += 1
+        if (len(line_out) == LINE_PIECE_SIZE or len(line_ans) == LINE_PIECE_SIZE) and \
+                not (is_line_end(line_out) and is_line_end(line_ans)):
+            reason = compare_long_line(ln, line_out, line_ans, output, answer)
+            if reason is not None:
+                return False, reason
+            continue
+        line_out = line_out.rstrip()
+        line_ans = line_ans.rstrip()
+        if line_out == line_ans:
+            continue
+        line_out = fold_yes_no(line_out)
+        line_ans = fold_yes_no(line_ans)
+        if line_out != line_ans:
+            logger.debug('Line %d differs: output="%s" answer="%s"', ln, line_out, line_ans)
+            return False, describe_line_difference(ln, line_out, line_ans)
+
+    # At least one side ended, the remaining lines of the other side must be empty
+    new_line = True  # whether the next piece starts a line
+    while line_out:
+        ln += new_line
+        new_line = is_line_end(line_out)
+        if line_out.strip():
+            return False, f"Expected end of output, found {shorten(line_out.rstrip())} on line {ln}"
+        line_out = output.readline(LINE_PIECE_SIZE)
+    while line_ans:
+        ln += new_line
+        new_line = is_line_end(line_ans)
+        if line_ans.strip():
+            return False, f"Expected more lines, output ended before line {ln}"
+        line_ans = answer.readline(LINE_PIECE_SIZE)
+    return True, "Passed"
+
+
+class TokenReader:
+    """ Read whitespace-separated tokens in batches, from chunks of TOKEN_CHUNK_SIZE.
+    Each chunk is split at once, and only a token cut by the end of a chunk is carried over
+    to the next one. Line numbers are only worked out for line_of, to describe a difference.
+    """
+
+    def __init__(self, stream: TextIO | BinaryIO):
+        self.stream = stream
+        self.ln = 1  # line of the next chunk
+        self._chunk: str | bytes = ''  # the chunk being taken, as read
+        self._chunk_ln = 1
+        self._tokens: list[str | bytes] = []  # tokens of the chunk
+        self._pos = 0  # index of the next token to take in _tokens
+        self._partial: str | bytes = ''  # trailing token of the last read, maybe cut
+        self._offsets: list[int] = []  # index in the last batch of each chunk's first token
+        self._chunks: list[tuple[str | bytes, int, int]] = []  # (chunk, line, index in it)
+
+    def _read_chunk(self) -> bool:
+        """ Read and split the next chunk, False at the end of the stream. """
+        data = self.stream.read(TOKEN_CHUNK_SIZE)
+        if not data and not self._partial:
+            return False
+        text = self._partial + data if self._partial else data
+        tokens = text.split()
+        if data and tokens and not text[-1:].isspace():
+            # The last token may go on in the next chunk
+            self._partial = tokens.pop()
+            text = text[:len(text) - len(self._partial)]
+        else:
+            self._partial = text[:0]
+        self._chunk, self._chunk_ln = text, self.ln
+        self._tokens, self._pos = tokens, 0
+        self.ln += text.count(b'\n' if isinstance(text, bytes) else '\n')
+        return True
+
+    def take(self, n: int) -> list[str | bytes]:
+        """ Take up to n tokens, fewer only at the end of the stream. """
+        tokens = []
+        self._offsets = []
+        self._chunks = []
+        while len(tokens) < n:
+            if self._pos == len(self._tokens):
+                if not self._read_chunk():
+                    break
+                continue
+            self._offsets.append(len(tokens))
+            self._chunks.append((self._chunk, self._chunk_ln, self._pos))
+            end = min(self._pos + n - len(tokens), len(self._tokens))
+            tokens += self._tokens[self._pos:end]
+            self._pos = end
+        return tokens
+
+    def line_of(self, i: int) -> int:
+        """ Line number of the i-th token in the last batch. """
+        j = bisect_right(self._offsets, i) - 1
+        chunk, ln, first = self._chunks[j]
+        pattern = TOKEN_PATTERN_BYTES if isinstance(chunk, bytes) else TOKEN_PATTERN
+        match = next(islice(pattern.finditer(chunk), first + i - self._offsets[j], None))
+        return ln + chunk.count(b'\n' if isinstance(chunk, bytes) else '\n', 0, match.start())
+
+
+def fold_yes_no_token(token: str | bytes) -> str | bytes:
+    lower = token.lower()
+    return lower if lower in ('yes', 'no', b'yes', b'no') else token
+
+def first_token_mismatch(tokens_out: list, tokens_ans: list) -> int | None:
+    """ Index of the first different token (yes/no case-insensitive), None if all equal. """
+    if tokens_out == tokens_ans:
+        return None
+    for i, (tok_out, tok_ans) in enumerate(zip(tokens_out, tokens_ans)):
+        if tok_out != tok_ans and fold_yes_no_token(tok_out) != fold_yes_no_token(tok_ans):
+            return i
+    return None
+
+def first_float_mismatch(
+    tokens_out: list,
+    tokens_ans: list,
+    abs_eps: float,
+    rel_eps: float,
+) -> int | None:
+    """ Like first_token_mismatch, but numbers only need to be within absolute or relative
+    error. Only the tokens that differ as text are parsed, at once with NumPy if available;
+    if some of them are words (or no NumPy), they are checked one by one.
+    """
+    if tokens_out == tokens_ans:
+        return None
+    differ = list(compress(count(), map(ne, tokens_out, tokens_ans)))
+    differ_out = list(map(tokens_out.__getitem__, differ))
+    differ_ans = list(map(tokens_ans.__getitem__, differ))
+    try:
+        import numpy as np
+        values_out = np.asarray(differ_out, dtype=np.float64)
+        values_ans = np.asarray(differ_ans, dtype=np.float64)
+    except ImportError:
+        logger.info("NumPy not installed, comparing floats token by token")
+    except (ValueError, TypeError):
+        logger.debug("Non-numeric tokens in batch, comparing token by token")
+    else:
+        with np.errstate(invalid='ignore'):
+            error = np.abs(values_out - values_ans)
+            ok = (error <= abs_eps) | (error <= rel_eps * np.abs(values_ans))
+        # An infinite error is within the relative error of an infinite answer, and inf - inf
+        # or nan is within no error, so only the same value is equal there
+        ok &= np.isfinite(error)
+        ok |= values_out == values_ans
+        bad = np.flatnonzero(~ok)
+        return differ[bad[0]] if len(bad) else None
+
+    for i, tok_out, tok_ans in zip(differ, differ_out, differ_ans):
+        if fold_yes_no_token(tok_out) == fold_yes_no_token(tok_ans):
+            continue
+        try:
+            value_out = float(tok_out)
+            value_ans = float(tok_ans)
+        except ValueError:
+            return i
+        if value_out == value_ans:
+            continue  # like inf and Infinity
+        error = abs(value_out - value_ans)
+        if not isfinite(error) or not (error <= abs_eps or error <= rel_eps * abs(value_ans)):
+            return i
+    return None
+
+def compare_tokens(
+    output: TextIO | BinaryIO,
+    answer: TextIO | BinaryIO,
+    abs_eps: float | None = None,
+    rel_eps: float | None = None,
+) -> tuple[bool, str]:
+    """ Compare output with answer token by token, ignoring all whitespaces.
+    If abs_eps and rel_eps are given, numbers are compared within absolute or relative error.
+    Tokens are read in chunks and compared in batches of TOKEN_BATCH_SIZE, so the memory use
+    is bounded no matter how big the output is (unless a single token is that big).
+    """
+    reader_out = TokenReader(output)
+    reader_ans = TokenReader(answer)
+    n = 0  # tokens compared so far
+    while True:
+        tokens_out = reader_out.take(TOKEN_BATCH_SIZE)
+        tokens_ans = reader_ans.take(TOKEN_BATCH_SIZE)
+        m = min(len(tokens_out), len(tokens_ans))
+        if abs_eps is None:
+            i = first_token_mismatch(tokens_out[:m], tokens_ans[:m])
+        else:
+            i = first_float_mismatch(tokens_out[:m], tokens_ans[:m], abs_eps, rel_eps)
+        if i is not None:
+            return False, (f"Expected {shorten(tokens_ans[i])} on line {reader_ans.line_of(i)} "
+                           f"(token {n+i+1}), found {shorten(tokens_out[i])} "
+                           f"on line {reader_out.line_of(i)}")
+        if len(tokens_out) != len(tokens_ans):
+            if len(tokens_out) < len(tokens_ans):
+                return False, f"Expected more tokens, output ended after {n+m} tokens"
+            return False, (f"Expected end of output, found {shorten(tokens_out[m])} "
+                           f"on line {reader_out.line_of(m)} (token {n+m+1})")
+        if not tokens_out:
+            return True, "Passed"
+        n += m
+
+def compare_unordered_lines(
+    output: TextIO | BinaryIO,
+    answer: TextIO | BinaryIO,
+) -> tuple[bool, str]:
+    """ Compare output with answer as multisets of lines, ignoring empty lines.
+    Trailing whitespaces are ignored and "yes"/"no" are case-insensitive as in line mode.
+    Only distinct answer lines are kept in memory.
+    """
+    expected = Counter(
+        fold_yes_no(line.rstrip()) for line in answer if line.strip()
+    )
+    for ln, line in enumerate(output, start=1):
+        if not line.strip():
+            continue
+        line = fold_yes_no(line.rstrip())
+        if expected[line] <= 0:
+            return False, f"Unexpected {shorten(line)} on line {ln}"
+        expected[line] -= 1
+    missing = +expected
+    if missing:
+        line, count = next(iter(missing.items()))
+        return False, f"Expected {shorten(line)} {count} more time(s), not found in output"
+    return True, "Passed"
@@ -1,35 +1,26 @@
 import os
+import signal
 import subprocess
-import re
+import sys
+import threading
 import time
 from logging import getLogger
-from typing import TextIO
+from pathlib import Path
+from typing import TextIO, TYPE_CHECKING
 from dataclasses import dataclass
 
-logger = getLogger(__name__)
+from pyforces.cf.capture import OutputCapture
+from pyforces.cf.checker import CHECKER_TIME_FACTOR, CHECKER_VERDICTS, Checker
+from pyforces.cf.compare import CompareMode, compare_output
+from pyforces.cf.limits import HAS_PRLIMIT, MemoryLimiter
+from pyforces.cf.supervisor import READER_GRACE, SupervisedProcess
+from pyforces.cf.timeline import ProcessTimeline
+from pyforces.utils import to_human_bytesize
+
+if TYPE_CHECKING:
+    from pyforces.cf.forkserver import ForkServer
 
-def compare_output(output: str, answer: str) -> tuple[bool, str]:
-    """ Compare output with answer. Return (passed, reason if not passed) """
-    # TODO: add more logics like floating-point errors
-    output = output.rstrip()
-    answer = answer.rstrip()
-    if re.search(r'\b(yes|no)\b', answer, flags=re.IGNORECASE):
-        logger.info('Found "Yes or No" type problem, performing case replacement')
-        output = re.sub(r'\b(yes|no)\b', lambda m: m.group(1).lower(), output, flags=re.IGNORECASE)
-        answer = re.sub(r'\b(yes|no)\b', lambda m: m.group(1).lower(), answer, flags=re.IGNORECASE)
-
-    logger.debug('output is %s, answer is %s', repr(output), repr(answer))
-    lines_output = output.splitlines()
-    lines_answer = answer.splitlines()
-    if len(lines_output) != len(lines_answer):
-        return False, f"Expected {len(lines_answer)} lines, found {len(lines_output)} lines"
-    for ln, (line_out, line_ans) in enumerate(zip(lines_output, lines_answer)):
-        line_out = line_out.rstrip()
-        line_ans = line_ans.rstrip()
-        logger.debug('Comparing line %d: output="%s" answer="%s"', ln+1, line_out, line_ans)
-        if line_out != line_ans:
-            return False, f"Expected {line_ans} on line {ln+1}, found {line_out}"
-    return True, "Passed"
+logger = getLogger(__name__)
 
 @dataclass
 class ExecuteResult:
@@ -41,6 +32,11 @@ class ExecuteResult:
     peak_memory: int  # in bytes
     passed: bool
     reason: str  # useful if failed
+    user_time: float | None = None  # in seconds, None if not tracked
+    sys_time: float | None = None  # in seconds, None if not tracked
+    wall_time: float | None = None  # in seconds
+    interactor_time: float | None = None  # CPU time of the interactor, in seconds
+    queries: int | None = None  # lines sent by the solution to the interactor, if counted
 
 class TraditionalExecutor:
     
@@ -48,8 +44,17 @@ class TraditionalExecutor:
         self,
         args: str | list[str] | None = None,
         shell: str | None = None,
-        time_limit: float = 2.0,  # in seconds
+        time_limit: float = 2.0,  # in seconds, on the judge
         memory_limit: int = 512*1024*1024,  # in bytes
+        compare_mode: CompareMode = CompareMode.LINES,
+        abs_eps: float = 1e-6,  # only used in float compare mode
+        rel_eps: float = 1e-6,  # only used in float compare mode
+        checker: Checker | None = None,  # if set, judge with it instead of comparing
+        enforce_memory: bool = True,  # kill or fail the program beyond memory_limit
+        speed_factor: float = 1.0,  # local CPU time / judge CPU time, see pyforces calibrate
+        forkserver: 'ForkServer | None' = None,  # run a Python solution from it, poll only
+        cpu: int | None = None,  # pin the program to this CPU, poll only
+        cancel: threading.Event | None = None,  # once set, programs are killed as they start
     ):
         if args:
             assert not shell, "Cannot pass both args and shell to TraditionalExecutor"
@@ -60,118 +65,167 @@ class TraditionalExecutor:
             self.args = shell
             self.is_shell = True
 
-        self.time_limit = time_limit
+        self.time_limit = time_limit * speed_factor  # the judge's limit on this machine
         self.memory_limit = memory_limit
+        self.compare_mode = compare_mode
+        self.abs_eps = abs_eps
+        self.rel_eps = rel_eps
+        self.checker = checker
+        self.enforce_memory = enforce_memory
+        self.forkserver = forkserver
+        self.cpu = cpu
+        self.cancel = cancel
 
-    def execute(self, input: TextIO, answer: TextIO, poll: bool) -> ExecuteResult:
+    def judge_output(self, output: OutputCapture, input: TextIO, answer: TextIO
+                     ) -> tuple[bool, str]:
+        """ Judge the output with the checker if any, else compare it with answer.
+        Byte-identical output passes without decoding anything.
+        """
+        if self.checker is not None:
+            with output.as_path() as output_file:
+                return self.checker.check(Path(input.name), output_file, Path(answer.name),
+                                          timeout=self.time_limit * CHECKER_TIME_FACTOR)
+        with open(answer.name, 'rb') as fp_ans:
+            if output.equals(fp_ans):
+                return True, "Passed"
+            return compare_output(
+                output.reader(), fp_ans, self.compare_mode, self.abs_eps, self.rel_eps,
+            )
+
+    def execute(self, input: TextIO, answer: TextIO, poll: bool,
+                timeline: ProcessTimeline | None = None) -> ExecuteResult:
         """ Given input and answer, execute the program and compare output with answer.
-        poll: whether use psutil Popen to track usage.
-        If poll, Unix and Windows have almost the same impl except for peak memory stats.
-        If no poll, on Unix will use getrusage to get peak memory of all test cases, and
-        no memory stats on Windows. Both have no memory limit.
+        poll: whether track usage of each run.
+        If poll, wait on the program's exit with a wall-clock deadline, and kill it on either
+        double the time limit of CPU time or triple of wall time. On Unix, user+sys time and
+        peak RSS come from wait4 at reap time; on Windows, from psutil.
+        If no poll, on Unix the peak RSS of each run comes from wait4 too, and there are no
+        memory stats on Windows.
+        If enforce_memory, on Unix the memory limit is enforced in the kernel by MemoryLimiter
+        in both modes, and the exact peak memory of each run is reported with cgroup v2.
+        If forkserver, each run is forked from it instead of starting a new interpreter.
+        The output goes to an OutputCapture rather than a pipe, and is judged as bytes.
+        If timeline, the program is sampled into it while running, poll only.
         """
+        with OutputCapture() as output:
+            return self._execute(input, answer, poll, output, timeline)
+
+    def _execute(self, input: TextIO, answer: TextIO, poll: bool, output: OutputCapture,
+                 timeline: ProcessTimeline | None) -> ExecuteResult:
         if poll:
-            logger.info("Using psutil to poll and track")
-            import psutil
-            proc = psutil.Popen(
+            logger.info("Supervising the program until exit or deadline")
+            usage = SupervisedProcess(
                 self.args,
                 shell=self.is_shell,
                 stdin=input,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
-            peak_memory = -1
-            user_time = 0.
-            polls = 0
-            while proc.poll() is None:
-                try:  # avoid TOCTOU
-                    user_time = proc.cpu_times().user
-                    match os.name:
-                        case 'posix':  # Linux, Mac
-                            peak_memory = max(peak_memory, proc.memory_info().rss)
-                        case 'nt':  # Windows
-                            peak_memory = proc.memory_info().peak_wset
-                except Exception as e:
-                    logger.info("Stats tracking error %s", e)
-                time.sleep(1e-5)
-                polls += 1
-                if user_time > self.time_limit * 2:  # Allows it to run double time_limit
-                    proc.kill()
-                    logger.info("Killed the program exceeding double timeout")
-                    return ExecuteResult(
-                        return_code=None,
-                        timeout=True,
-                        runtime_error=None,
-                        execution_time=user_time,
-                        memory_exceeded=peak_memory>self.memory_limit,
-                        peak_memory=peak_memory,
-                        passed=False,
-                        reason=f"Time limit exceeded: {user_time} seconds",
-                    )
-            logger.info("Ran the program in %.2f seconds and %d peak memory", user_time, peak_memory)
-            logger.debug("Polled %d times", polls)
-            if proc.returncode:
+                cpu_limit=self.time_limit * 2,  # Allows it to run double time_limit
+                wall_limit=self.time_limit * 3,  # Catches programs that sleep or block
+                stdout=output.file,
+                memory_limit=self.memory_limit if self.enforce_memory else None,
+                forkserver=self.forkserver,
+                cpu=self.cpu,
+                timeline=timeline,
+                cancel=self.cancel,
+            ).wait()
+            cpu_time = usage.cpu_time
+            peak_memory = usage.peak_memory
+            logger.info("Ran the program in %.2f seconds and %d peak memory", cpu_time, peak_memory)
+            if usage.memory_exceeded:
                 return ExecuteResult(
-                    return_code=proc.returncode,
-                    timeout=user_time>self.time_limit,
+                    return_code=usage.return_code,
+                    timeout=False,
+                    runtime_error=False,
+                    memory_exceeded=True,
+                    execution_time=cpu_time,
+                    peak_memory=peak_memory,
+                    passed=False,
+                    reason=f"Memory limit exceeded: {to_human_bytesize(self.memory_limit)}",
+                    user_time=usage.user_time,
+                    sys_time=usage.sys_time,
+                    wall_time=usage.wall_time,
+                )
+            if usage.killed:
+                logger.info("Killed the program exceeding the CPU or wall-clock limit")
+                return ExecuteResult(
+                    return_code=None,
+                    timeout=True,
+                    runtime_error=None,
+                    execution_time=cpu_time,
+                    memory_exceeded=peak_memory>self.memory_limit,
+                    peak_memory=peak_memory,
+                    passed=False,
+                    reason=f"Time limit exceeded: killed after {cpu_time:.2f} seconds "
+                    f"of CPU time and {usage.wall_time:.2f} seconds of wall time",
+                    user_time=usage.user_time,
+                    sys_time=usage.sys_time,
+                    wall_time=usage.wall_time,
+                )
+            if usage.return_code:
+                return ExecuteResult(
+                    return_code=usage.return_code,
+                    timeout=cpu_time>self.time_limit,
                     runtime_error=True,
                     memory_exceeded=peak_memory>self.memory_limit,
-                    execution_time=user_time,
+                    execution_time=cpu_time,
                     peak_memory=peak_memory,
                     passed=False,
-                    reason=f"Runtime error, exit code {proc.returncode}" + \
-                    (': ' + proc.stderr.decode().strip() if proc.stderr else ''),
+                    reason=f"Runtime error, exit code {usage.return_code}" + \
+                    (': ' + usage.stderr.strip() if usage.stderr else ''),
+                    user_time=usage.user_time,
+                    sys_time=usage.sys_time,
+                    wall_time=usage.wall_time,
                 )
-            if user_time > self.time_limit:
+            if cpu_time > self.time_limit:
                 return ExecuteResult(
-                    return_code=proc.returncode,
+                    return_code=usage.return_code,
                     timeout=True,
                     runtime_error=False,
                     memory_exceeded=peak_memory>self.memory_limit,
-                    execution_time=user_time,
+                    execution_time=cpu_time,
                     peak_memory=peak_memory,
                     passed=False,
-                    reason=f"Time limit exceeded: {user_time} seconds",
+                    reason=f"Time limit exceeded: {cpu_time} seconds",
+                    user_time=usage.user_time,
+                    sys_time=usage.sys_time,
+                    wall_time=usage.wall_time,
                 )
 
-            passed, reason = compare_output(proc.stdout.read(), answer.read())
+            passed, reason = self.judge_output(output, input, answer)
             return ExecuteResult(
-                return_code=proc.returncode,
+                return_code=usage.return_code,
                 timeout=False,
                 runtime_error=False,
-                execution_time=user_time,
+                execution_time=cpu_time,
                 peak_memory=peak_memory,
                 memory_exceeded=peak_memory>self.memory_limit,
                 passed=passed,
                 reason=reason,
+                user_time=usage.user_time,
+                sys_time=usage.sys_time,
+                wall_time=usage.wall_time,
             )
         
         else:  # no poll
             logger.info("Not polling, using subprocess.run")
+            limiter = MemoryLimiter(self.memory_limit) \
+                if self.enforce_memory and os.name == 'posix' else None
+            usage = {}
             try:
                 # Run subprocess with provided input and timeout
                 start_time = time.perf_counter()
-                proc = subprocess.run(
-                    self.args,
-                    shell=self.is_shell,
-                    stdin=input,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=self.time_limit,
-                    text=True,
-                    check=True,
-                )
+                proc = self._run(input, output, limiter, usage)
                 end_time = time.perf_counter()
+                peak_memory = usage['peak_memory']
 
-                passed, reason = compare_output(proc.stdout, answer.read())
+                passed, reason = self.judge_output(output, input, answer)
 
                 return ExecuteResult(
                     return_code=proc.returncode,
                     timeout=False,
                     runtime_error=False,
                     execution_time=end_time-start_time,
-                    peak_memory=None,
+                    wall_time=end_time-start_time,
+                    peak_memory=peak_memory,
                     memory_exceeded=None,
                     passed=passed,
                     reason=reason,
@@ -184,7 +238,8 @@ class TraditionalExecutor:
                     timeout=True,
                     runtime_error=None,
                     execution_time=end_time-start_time,
-                    peak_memory=None,
+                    wall_time=end_time-start_time,
+                    peak_memory=usage['peak_memory'],
                     memory_exceeded=None,
                     passed=False,
                     reason=f"Time limit exceeded: {end_time - start_time} seconds",
@@ -193,8 +248,18 @@ class TraditionalExecutor:
             except subprocess.CalledProcessError as e:
                 # Non-zero exit code encountered
                 end_time = time.perf_counter()
-                # usage = resource.getrusage(resource.RUSAGE_CHILDREN)
-                # peak_memory = usage.ru_maxrss * 1024
+                if limiter and limiter.exceeded(e.returncode, usage['peak_memory'], e.stderr):
+                    return ExecuteResult(
+                        return_code=e.returncode,
+                        timeout=False,
+                        runtime_error=False,
+                        memory_exceeded=True,
+                        execution_time=end_time-start_time,
+                        wall_time=end_time-start_time,
+                        peak_memory=usage['peak_memory'],
+                        passed=False,
+                        reason=f"Memory limit exceeded: {to_human_bytesize(self.memory_limit)}",
+                    )
 
                 return ExecuteResult(
                     return_code=e.returncode,
@@ -202,9 +267,299 @@ class TraditionalExecutor:
                     runtime_error=True,
                     memory_exceeded=None,
                     execution_time=end_time-start_time,
-                    peak_memory=None,
+                    wall_time=end_time-start_time,
+                    peak_memory=usage['peak_memory'],
                     passed=False,
                     reason=f"Runtime error, exit code {e.returncode}" + \
-                    (': ' + e.stderr.decode().strip() if e.stderr else ''),
+                    (': ' + e.stderr.strip() if e.stderr else ''),
                 )
 
+            finally:
+                if limiter:
+                    limiter.close()
+
+    def _run(self, input: TextIO, output: OutputCapture, limiter: MemoryLimiter | None,
+             usage: dict) -> subprocess.CompletedProcess:
+        """ subprocess.run with check and the time limit as timeout. The memory limit is set
+        without a preexec_fn where possible, as -j runs it from several threads.
+        On Unix, the program runs in its own session, and on timeout its whole process group
+        is killed, so that nothing it started keeps running. It's reaped with wait4, and
+        usage['peak_memory'] is set to its peak from the cgroup or else its peak RSS, even
+        if it fails (None on Windows).
+        """
+        args, shell = self.args, self.is_shell
+        if limiter and HAS_PRLIMIT:
+            args, shell = limiter.wrap(args, shell), False
+        usage['peak_memory'] = None
+        with subprocess.Popen(
+            args,
+            shell=shell,
+            stdin=input,
+            stdout=output.file,
+            stderr=subprocess.PIPE,
+            text=True,
+            preexec_fn=limiter.preexec if limiter and not HAS_PRLIMIT else None,
+            start_new_session=os.name == 'posix',
+        ) as proc:
+            try:
+                if os.name == 'posix':
+                    stderr = self._wait(proc, limiter, usage)
+                else:
+                    _, stderr = proc.communicate(timeout=self.time_limit)
+            except:
+                if os.name == 'posix':
+                    if proc.returncode is None:  # not reaped yet
+                        _kill_group(proc)
+                else:
+                    proc.kill()
+                raise  # the with block waits for it
+        if proc.returncode:
+            raise subprocess.CalledProcessError(proc.returncode, self.args, stderr=stderr)
+        return subprocess.CompletedProcess(self.args, proc.returncode, stderr=stderr)
+
+    def _wait(self, proc: subprocess.Popen, limiter: MemoryLimiter | None, usage: dict) -> str:
+        """ Read the program's stderr until it exits and reap it with wait4, killing its
+        process group at the time limit. Returns stderr, raises TimeoutExpired once reaped
+        if it was killed.
+        """
+        chunks = []
+        reader = threading.Thread(target=lambda: chunks.append(proc.stderr.read()), daemon=True)
+        reader.start()
+        lock = threading.Lock()
+        exited = timed_out = False
+
+        def kill():
+            nonlocal timed_out
+            with lock:
+                if not exited:
+                    timed_out = True
+                    _kill_group(proc)
+
+        timer = threading.Timer(self.time_limit, kill)
+        timer.start()
+        try:
+            # Wait without reaping, so that the timer never signals a recycled pid
+            os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        finally:
+            timer.cancel()
+        with lock:
+            exited = True
+            _kill_group(proc)  # whatever it left behind
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss also counts what ran before the exec (the shell or python), so prefer
+        # the cgroup's
+        peak_memory = limiter and limiter.peak()
+        if peak_memory is None:
+            peak_memory = rusage.ru_maxrss
+            if sys.platform != 'darwin':
+                peak_memory *= 1024  # on Linux it's KB
+        usage['peak_memory'] = peak_memory
+        reader.join(READER_GRACE)
+        stderr = chunks[0] if chunks else ''
+        if timed_out:
+            raise subprocess.TimeoutExpired(self.args, self.time_limit, stderr=stderr)
+        return stderr
+
+
+def _kill_group(proc: subprocess.Popen):
+    """ SIGKILL the process group of a program started in its own session. """
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class InteractiveExecutor:
+    """ Run the solution against an interactor, connected by two pipes.
+    The interactor is testlib-style, run as `interactor <input> <output> <answer>`, reading
+    the solution's stdout from its stdin and writing to the solution's stdin. Its exit code
+    decides the verdict, and if a checker is given, the interactor's output file is then
+    judged by the checker.
+    The pipes connect the two processes directly, so forwarding costs nothing in Python
+    unless queries are counted.
+    """
+
+    def __init__(
+        self,
+        interactor: list[str],
+        args: str | list[str] | None = None,
+        shell: str | None = None,
+        time_limit: float = 2.0,  # in seconds, on the judge
+        memory_limit: int = 512*1024*1024,  # in bytes
+        checker: Checker | None = None,
+        count_queries: bool = False,
+        speed_factor: float = 1.0,  # local CPU time / judge CPU time, see pyforces calibrate
+        cancel: threading.Event | None = None,  # once set, programs are killed as they start
+    ):
+        if args:
+            assert not shell, "Cannot pass both args and shell to InteractiveExecutor"
+            self.args = args
+            self.is_shell = False
+        else:
+            assert shell, "Must pass either args or shell to InteractiveExecutor"
+            self.args = shell
+            self.is_shell = True
+
+        self.interactor = interactor
+        self.time_limit = time_limit * speed_factor  # the judge's limit on this machine
+        self.memory_limit = memory_limit
+        self.checker = checker
+        self.count_queries = count_queries
+        self.cancel = cancel
+
+    @staticmethod
+    def relay(fd_in: int, fd_out: int, counter: dict):
+        """ Forward raw bytes until EOF, counting lines in chunks (not per message). """
+        lines = 0
+        try:
+            while chunk := os.read(fd_in, 1 << 16):
+                lines += chunk.count(b'\n')
+                os.write(fd_out, chunk)
+        except BrokenPipeError:
+            logger.info("Interactor closed its input")
+        finally:
+            counter['queries'] = lines
+            os.close(fd_in)
+            os.close(fd_out)
+
+    def execute(self, input: TextIO, answer: TextIO, poll: bool = True,
+                timeline: ProcessTimeline | None = None) -> ExecuteResult:
+        """ Given input and answer, run the solution with the interactor and judge it.
+        Both sides are always supervised (poll is ignored), each with its own CPU time.
+        If timeline, the solution is sampled into it while running.
+        """
+        import tempfile  # only interactive problems need it, keep it off the startup path
+        # delete=False so that the interactor can open it on Windows
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as fp_out:
+            output_file = Path(fp_out.name)
+        to_solution_r, to_solution_w = os.pipe()
+        to_interactor_r, to_interactor_w = os.pipe()
+        if self.count_queries:
+            # solution -> relay thread -> interactor
+            from_solution_r, from_solution_w = os.pipe()
+            child_fds = [to_solution_r, to_solution_w, to_interactor_r, from_solution_w]
+            relay_fds = [from_solution_r, to_interactor_w]
+        else:
+            from_solution_w = to_interactor_w
+            child_fds = [to_solution_r, to_solution_w, to_interactor_r, to_interactor_w]
+            relay_fds = []
+
+        interactor = solution = None
+        try:
+            interactor = SupervisedProcess(
+                self.interactor + [input.name, str(output_file), answer.name],
+                shell=False,
+                stdin=to_interactor_r,
+                stdout=to_solution_w,
+                cpu_limit=self.time_limit * 2,
+                wall_limit=self.time_limit * 3,
+                cancel=self.cancel,
+            )
+            solution = SupervisedProcess(
+                self.args,
+                shell=self.is_shell,
+                stdin=to_solution_r,
+                stdout=from_solution_w,
+                cpu_limit=self.time_limit * 2,  # Allows it to run double time_limit
+                wall_limit=self.time_limit * 3,  # Catches programs that sleep or block
+                memory_limit=self.memory_limit,
+                timeline=timeline,
+                cancel=self.cancel,
+            )
+        except Exception:
+            if interactor:
+                interactor.kill()
+            for fd in relay_fds:
+                os.close(fd)
+            os.unlink(output_file)
+            raise
+        finally:
+            # The children hold their own copies, close ours so that EOF can be seen
+            for fd in child_fds:
+                os.close(fd)
+
+        counter = {}
+        if self.count_queries:
+            relay = threading.Thread(target=self.relay, args=(*relay_fds, counter), daemon=True)
+            relay.start()
+        usage = solution.wait()
+        usage_interactor = interactor.wait()
+        if self.count_queries:
+            relay.join()
+        logger.info("Solution used %.2fs, interactor used %.2fs of CPU time",
+                    usage.cpu_time, usage_interactor.cpu_time)
+
+        common = dict(
+            execution_time=usage.cpu_time,
+            peak_memory=usage.peak_memory,
+            memory_exceeded=usage.peak_memory>self.memory_limit,
+            user_time=usage.user_time,
+            sys_time=usage.sys_time,
+            wall_time=usage.wall_time,
+            interactor_time=usage_interactor.cpu_time,
+            queries=counter.get('queries'),
+        )
+        try:
+            if usage.killed or usage.cpu_time > self.time_limit:
+                return ExecuteResult(
+                    return_code=None if usage.killed else usage.return_code,
+                    timeout=True,
+                    runtime_error=None,
+                    passed=False,
+                    reason=f"Time limit exceeded: {usage.cpu_time:.2f} seconds of CPU time "
+                    f"and {usage.wall_time:.2f} seconds of wall time",
+                    **common,
+                )
+            if usage.memory_exceeded:
+                return ExecuteResult(
+                    return_code=usage.return_code,
+                    timeout=False,
+                    runtime_error=False,
+                    passed=False,
+                    reason=f"Memory limit exceeded: {to_human_bytesize(self.memory_limit)}",
+                    **(common | dict(memory_exceeded=True)),
+                )
+            if usage_interactor.return_code:
+                # The interactor's verdict goes first, the solution may have died of a broken pipe
+                message = (usage_interactor.stderr or '').strip()
+                if usage_interactor.killed:
+                    verdict = "Interactor killed (is the solution waiting for input?)"
+                else:
+                    verdict = CHECKER_VERDICTS.get(
+                        usage_interactor.return_code,
+                        f"Interactor exited with code {usage_interactor.return_code}",
+                    )
+                return ExecuteResult(
+                    return_code=usage.return_code,
+                    timeout=False,
+                    runtime_error=bool(usage.return_code),
+                    passed=False,
+                    reason=f"{verdict}: {message}" if message else verdict,
+                    **common,
+                )
+            if usage.return_code:
+                return ExecuteResult(
+                    return_code=usage.return_code,
+                    timeout=False,
+                    runtime_error=True,
+                    passed=False,
+                    reason=f"Runtime error, exit code {usage.return_code}" + \
+                    (': ' + usage.stderr.strip() if usage.stderr else ''),
+                    **common,
+                )
+            if self.checker:
+                passed, reason = self.checker.check(Path(input.name), output_file, Path(answer.name),
+                                                    timeout=self.time_limit * CHECKER_TIME_FACTOR)
+            else:
+                passed, reason = True, "Passed"
+            return ExecuteResult(
+                return_code=usage.return_code,
+                timeout=False,
+                runtime_error=False,
+                passed=passed,
+                reason=reason,
+                **common,
+            )
+        finally:
+            os.unlink(output_file)
@@ -0,0 +1,242 @@
+import ast
+import importlib
+import json
+import os
+import selectors
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import traceback
+from pathlib import Path
+from types import SimpleNamespace
+
+# The server runs this file as a script, so only the standard library is imported here,
+# leaving sys.modules as clean as a fresh interpreter for the solution.
+
+
+def preload_imports(solution: Path):
+    """ Import the top-level dependencies of the solution, ignoring failures. """
+    tree = ast.parse(solution.read_text())
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass  # the solution will raise it itself if it matters
+
+def apply_limits(limits: dict):
+    """ Same as SupervisedProcess._preexec. """
+    import resource
+    if limits.get('cpu_limit'):
+        soft = limits['cpu_limit']
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+    if limits.get('cgroup'):
+        with open(os.path.join(limits['cgroup'], 'cgroup.procs'), 'w') as fp:
+            fp.write(str(os.getpid()))
+    elif limits.get('memory_limit'):
+        limit = limits['memory_limit']
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if limits.get('cpu') is not None:
+        try:
+            os.sched_setaffinity(0, {limits['cpu']})
+        except OSError:
+            pass  # e.g. not in our cpuset, run unpinned
+
+def run_child(solution: Path, fds: list[int], limits: dict):
+    """ In the forked child: redirect stdio, run the solution as __main__, never return. """
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    code = 0
+    try:
+        apply_limits(limits)
+        sys.stdin = sys.__stdin__ = open(0, closefd=False)
+        sys.stdout = sys.__stdout__ = open(1, 'w', closefd=False)
+        sys.stderr = sys.__stderr__ = open(2, 'w', closefd=False, buffering=1)
+        sys.argv = [str(solution)]
+        import runpy
+        runpy.run_path(str(solution), run_name='__main__')
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            code = code or 1
+    os._exit(code)
+
+def serve(sock_path: str, solution: Path):
+    """ Accept one connection per run: receive (stdin, stdout, stderr) fds and limits, fork,
+    reply the child's pid, then its wait status and rusage once it's reaped.
+    The client may send "kill" on the connection; the child is killed through its pidfd,
+    so a recycled pid is never signaled. Exit when stdin is closed (the client is gone).
+    """
+    sys.path[0] = str(solution.parent.absolute())
+    preload_imports(solution)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(sock_path)
+    listener.listen()
+    sel = selectors.DefaultSelector()
+    sel.register(listener, selectors.EVENT_READ, 'accept')
+    sel.register(0, selectors.EVENT_READ, 'stdin')
+    children = {}  # conn -> (pid, pidfd)
+    print('ready', flush=True)
+
+    while True:
+        for key, _ in sel.select():
+            if key.data == 'stdin':
+                if not os.read(0, 1024):
+                    for pid, pidfd in children.values():
+                        signal.pidfd_send_signal(pidfd, signal.SIGKILL)
+                    return
+            elif key.data == 'accept':
+                conn, _ = listener.accept()
+                msg, fds, _, _ = socket.recv_fds(conn, 1 << 16, 3)
+                limits = json.loads(msg)
+                pid = os.fork()
+                if pid == 0:
+                    sel.close()
+                    listener.close()
+                    for other in children:
+                        other.close()
+                    for _, pidfd in children.values():
+                        os.close(pidfd)
+                    conn.close()
+                    run_child(solution, fds, limits)
+                for fd in fds:
+                    os.close(fd)
+                pidfd = os.pidfd_open(pid)
+                children[conn] = (pid, pidfd)
+                conn.sendall(json.dumps({'pid': pid}).encode() + b'\n')
+                sel.register(conn, selectors.EVENT_READ, 'conn')
+                sel.register(pidfd, selectors.EVENT_READ, conn)
+            elif key.data == 'conn':
+                conn = key.fileobj
+                if conn not in children:
+                    continue  # reaped in this same round
+                _, pidfd = children[conn]
+                # "kill", or EOF if the client is gone
+                signal.pidfd_send_signal(pidfd, signal.SIGKILL)
+                if not conn.recv(1024):
+                    sel.unregister(conn)
+            else:  # pidfd readable, the child exited
+                conn = key.data
+                pid, pidfd = children.pop(conn)
+                sel.unregister(pidfd)
+                _, status, rusage = os.wait4(pid, 0)
+                os.close(pidfd)
+                try:
+                    conn.sendall(json.dumps({
+                        'status': status,
+                        'ru_utime': rusage.ru_utime,
+                        'ru_stime': rusage.ru_stime,
+                        'ru_maxrss': rusage.ru_maxrss,
+                    }).encode() + b'\n')
+                except OSError:
+                    pass  # the client is gone
+                try:
+                    sel.unregister(conn)
+                except KeyError:
+                    pass  # unregistered on EOF
+                conn.close()
+
+
+class ForkedProcess:
+    """ A child of the fork server, with the Popen attributes SupervisedProcess needs. """
+
+    def __init__(self, conn: socket.socket, stdout, stderr):
+        self.conn = conn
+        self._reader = conn.makefile('rb')
+        self.pid = json.loads(self._reader.readline())['pid']
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+
+    def kill(self):
+        try:
+            self.conn.sendall(b'kill\n')
+        except OSError:
+            pass  # already exited
+
+    def wait4(self):
+        """ Block until the server reaps the child, return (status, rusage). """
+        line = self._reader.readline()
+        self._reader.close()
+        self.conn.close()
+        if not line:
+            raise ChildProcessError("Fork server exited unexpectedly")
+        result = json.loads(line)
+        return result['status'], SimpleNamespace(
+            ru_utime=result['ru_utime'],
+            ru_stime=result['ru_stime'],
+            ru_maxrss=result['ru_maxrss'],
+        )
+
+
+class ForkServer:
+    """ A pre-warmed interpreter for a Python solution. It imports the solution's top-level
+    dependencies once, then forks a fresh child per run, so the interpreter startup and
+    import time are not paid (nor measured) per test. Linux only (needs pidfd).
+    """
+
+    def __init__(self, solution: Path):
+        self._dir = tempfile.mkdtemp(prefix='pyforces-')
+        self.sock_path = os.path.join(self._dir, 'forkserver.sock')
+        self.proc = subprocess.Popen(
+            [sys.executable, __file__, self.sock_path, str(solution.absolute())],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        if self.proc.stdout.readline() != b'ready\n':
+            self.close()
+            raise RuntimeError("Fork server failed to start")
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform == 'linux' and hasattr(os, 'pidfd_open') and \
+            hasattr(socket, 'send_fds')
+
+    def spawn(self, stdin: int, stdout: int, stderr: int, limits: dict,
+              stdout_reader=None, stderr_reader=None) -> ForkedProcess:
+        """ Fork a child running the solution with the given fds as its stdio. """
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(self.sock_path)
+        socket.send_fds(conn, [json.dumps(limits).encode()], [stdin, stdout, stderr])
+        return ForkedProcess(conn, stdout_reader, stderr_reader)
+
+    def close(self):
+        if self.proc.stdin:
+            self.proc.stdin.close()  # the server exits on EOF
+        self.proc.wait()
+        self.proc.stdout.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1], Path(sys.argv[2]))
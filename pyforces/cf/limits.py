@@ -0,0 +1,154 @@
+import functools
+import itertools
+import os
+import sys
+from logging import getLogger
+from pathlib import Path
+
+if os.name == 'posix':
+    import resource
+    HAS_PRLIMIT = hasattr(resource, 'prlimit')  # Linux only
+else:
+    HAS_PRLIMIT = False
+
+logger = getLogger(__name__)
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+# Under RLIMIT_AS, a failed run with a peak RSS above this fraction of the limit, or one
+# that printed any of these, is counted as exceeding it
+NEAR_LIMIT = 0.9
+ALLOCATION_FAILURES = (
+    'std::bad_alloc',  # C++
+    'MemoryError',  # Python
+    'memory allocation of',  # Rust
+    'Cannot allocate memory',
+    'out of memory',
+)
+
+_cgroup_ids = itertools.count()
+
+@functools.cache
+def memory_cgroup_parent() -> Path | None:
+    """ A cgroup v2 directory where children get the memory controller, None if unavailable.
+    That's pyforces' own cgroup or its parent, whichever already has memory in its
+    cgroup.subtree_control and is writable: as root, or in a delegated cgroup set up for it,
+    like a leaf of a `systemd-run --user -p Delegate=yes` unit with +memory in the unit's
+    subtree_control. pyforces never enables controllers or moves itself, that would change
+    the machine's cgroup tree for good; the runs' own cgroups are removed after them.
+    """
+    if sys.platform != 'linux':
+        return None
+    try:
+        with open('/proc/self/cgroup') as fp:
+            path = next(line[3:].strip() for line in fp if line.startswith('0::'))
+        own = CGROUP_ROOT / path.lstrip('/')
+        for cgroup in (own, own.parent) if own != CGROUP_ROOT else (own,):
+            if 'memory' in (cgroup / 'cgroup.subtree_control').read_text().split() and \
+                    os.access(cgroup, os.W_OK):
+                logger.info("Using cgroup %s to limit memory", cgroup)
+                return cgroup
+        logger.info("Neither cgroup %s nor its parent is writable with the memory controller "
+                    "enabled for children, limiting memory with RLIMIT_AS", own)
+        return None
+    except (OSError, StopIteration) as e:
+        logger.info("Cannot use cgroup v2 to limit memory, limiting it with RLIMIT_AS: %s", e)
+        return None
+
+
+class MemoryLimiter:
+    """ Enforce a memory limit on one run in the kernel.
+    With cgroup v2, the program runs in its own cgroup with memory.max, is OOM-killed on
+    exceeding it, and the exact peak is read from memory.peak. Otherwise fall back to
+    RLIMIT_AS, so allocations beyond the limit fail (it counts virtual memory).
+    On Linux, start the program with `wrap(args)`, and call `close` after it's reaped.
+    Elsewhere, pass `preexec` as preexec_fn instead.
+    """
+
+    def __init__(self, memory_limit: int):
+        self.memory_limit = memory_limit
+        self.cgroup = None
+        parent = memory_cgroup_parent()
+        if parent is None:
+            return
+        cgroup = parent / f"pyforces-{os.getpid()}-{next(_cgroup_ids)}"
+        try:
+            cgroup.mkdir()
+            (cgroup / 'memory.max').write_text(str(memory_limit))
+            if (cgroup / 'memory.swap.max').exists():
+                (cgroup / 'memory.swap.max').write_text('0')  # don't swap the machine
+            self.cgroup = cgroup
+        except OSError as e:
+            logger.info("Cannot create cgroup %s: %s", cgroup, e)
+            try:
+                cgroup.rmdir()
+            except OSError:
+                pass
+
+    def wrap(self, args: str | list[str], shell: bool) -> list[str]:
+        """ Args that put the program under the limit before it starts, through a shell that
+        joins the cgroup or sets the rlimit and then execs it. Unlike a preexec_fn, that's
+        safe with other threads running (like with -j), and unlike limiting it from the
+        parent after the spawn, there's no window where it runs unlimited.
+        The program replaces the shell, so it's the process that was started; only with
+        shell it runs under `sh -c`, like Popen does. Pass shell=False to Popen.
+        """
+        if shell:
+            args = ['/bin/sh', '-c', args] if isinstance(args, str) else \
+                ['/bin/sh', '-c', *args]
+        elif isinstance(args, str):
+            args = [args]
+        if self.cgroup is not None:
+            return ['/bin/sh', '-c', 'echo $$ > "$0" && exec "$@"',
+                    str(self.cgroup / 'cgroup.procs'), *args]
+        return ['/bin/sh', '-c', 'ulimit -v "$0" && exec "$@"',
+                str(self.memory_limit // 1024), *args]
+
+    def preexec(self):
+        """ Runs in the child between fork and exec, keep it minimal. """
+        resource.setrlimit(resource.RLIMIT_AS, (self.memory_limit, self.memory_limit))
+
+    def peak(self) -> int | None:
+        """ Exact peak memory of the run in bytes, None if not available. """
+        if self.cgroup is None:
+            return None
+        try:
+            return int((self.cgroup / 'memory.peak').read_text())
+        except (OSError, ValueError):  # memory.peak needs Linux 5.19
+            return None
+
+    def oom_killed(self) -> bool:
+        """ Whether the program was killed for exceeding the limit. """
+        if self.cgroup is None:
+            return False
+        try:
+            for line in (self.cgroup / 'memory.events').read_text().splitlines():
+                key, value = line.split()
+                if key == 'oom_kill':
+                    return int(value) > 0
+        except (OSError, ValueError) as e:
+            logger.info("Cannot read memory events: %s", e)
+        return False
+
+    def exceeded(self, return_code: int, peak_memory: int | None, stderr: str | None) -> bool:
+        """ Whether a run that failed with return_code went over the limit. With cgroup v2,
+        the kernel killed it. With RLIMIT_AS, an allocation failed, and the program died as
+        it liked: guess from its peak RSS or an allocation error message.
+        """
+        if self.cgroup is not None:
+            return self.oom_killed()
+        if not return_code:
+            return False
+        if peak_memory is not None and peak_memory >= self.memory_limit * NEAR_LIMIT:
+            return True
+        stderr = stderr or ''
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode(errors='replace')
+        return any(message in stderr for message in ALLOCATION_FAILURES)
+
+    def close(self):
+        if self.cgroup is not None:
+            try:
+                self.cgroup.rmdir()
+            except OSError as e:
+                logger.info("Cannot remove cgroup %s: %s", self.cgroup, e)
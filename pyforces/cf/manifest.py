@@ -0,0 +1,176 @@
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+TESTCASE_PATTERN = re.compile(r'in(\d+)\.txt')
+BIG_INPUT_SIZE = 1 << 20  # inputs from this size are tagged "big"
+
+
+class TestOrigin(Enum):
+    SAMPLE = 'sample'  # parsed from the problem page
+    CUSTOM = 'custom'  # added by the user
+    STRESS = 'stress'  # a failing test found by pyforces stress
+
+
+@dataclass
+class Testcase:
+    idx: int
+    input: str  # path relative to the problem directory
+    answer: str
+    input_size: int  # in bytes
+    answer_size: int
+    input_hash: str  # sha256
+    answer_hash: str
+    mtime_ns: int  # latest mtime of input and answer when hashed
+    origin: str  # value of TestOrigin
+    tags: list[str] = field(default_factory=list)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def parse_index_spec(spec: str) -> set[int]:
+    """ Parse a selection like "3,5-9" into {3, 5, 6, 7, 8, 9}.
+    Raise ValueError with a message for the user on anything else, like "3-" or "a".
+    """
+    indices = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            lo, hi = map(int, part.split('-', 1)) if '-' in part else (int(part),) * 2
+        except ValueError:
+            raise ValueError(f'Invalid testcase selection "{part}", expected indices '
+                             f'and ranges like "3,5-9"') from None
+        if lo > hi:
+            raise ValueError(f'Invalid testcase range "{part}", the first index is larger')
+        indices.update(range(lo, hi + 1))
+    return indices
+
+
+class Manifest:
+    """ The testcases of a problem, stored in `.pyforces/tests.json` under the problem
+    directory. Use `Manifest.from_dir` to load it, and `sync` to pick up tests added or
+    edited by hand: the directory is listed once, and only changed files are hashed.
+    """
+
+    def __init__(self, testcases: list[Testcase], manifest_file: Path):
+        self.testcases = {t.idx: t for t in testcases}
+        self._manifest_file = manifest_file
+        self._dir = manifest_file.parent.parent
+
+    @classmethod
+    def from_dir(cls, path: Path):
+        manifest_file = path / '.pyforces' / 'tests.json'
+        try:
+            with manifest_file.open() as fp:
+                testcases = [Testcase(**t) for t in json.load(fp)]
+        except FileNotFoundError:
+            testcases = []
+        except (json.JSONDecodeError, TypeError):
+            logger.error("Testcase manifest %s is broken, rebuilding it", manifest_file)
+            testcases = []
+        return cls(testcases, manifest_file)
+
+    def save(self):
+        self._manifest_file.parent.mkdir(exist_ok=True)
+        with self._manifest_file.open('w') as fp:
+            json.dump([asdict(t) for t in self.sorted()], fp, indent=4)
+
+    def sorted(self) -> list[Testcase]:
+        return [self.testcases[idx] for idx in sorted(self.testcases)]
+
+    def _record(self, idx: int, origin: TestOrigin, tags: list[str]) -> Testcase:
+        input_file = self._dir / f"in{idx}.txt"
+        answer_file = self._dir / f"ans{idx}.txt"
+        input_data = input_file.read_bytes()
+        answer_data = answer_file.read_bytes()
+        tags = list(tags)
+        if len(input_data) >= BIG_INPUT_SIZE and 'big' not in tags:
+            tags.append('big')
+        testcase = Testcase(
+            idx=idx,
+            input=input_file.name,
+            answer=answer_file.name,
+            input_size=len(input_data),
+            answer_size=len(answer_data),
+            input_hash=content_hash(input_data),
+            answer_hash=content_hash(answer_data),
+            mtime_ns=max(input_file.stat().st_mtime_ns, answer_file.stat().st_mtime_ns),
+            origin=origin.value,
+            tags=tags,
+        )
+        self.testcases[idx] = testcase
+        return testcase
+
+    def put(self, idx: int, input: str | bytes, answer: str | bytes,
+            origin: TestOrigin, tags: list[str] = ()) -> Testcase:
+        """ Write in{idx}.txt and ans{idx}.txt, replacing the testcase if any. """
+        for name, content in ((f"in{idx}.txt", input), (f"ans{idx}.txt", answer)):
+            if isinstance(content, str):
+                (self._dir / name).write_text(content)
+            else:
+                (self._dir / name).write_bytes(content)
+        return self._record(idx, origin, tags)
+
+    def add(self, input: str | bytes, answer: str | bytes,
+            origin: TestOrigin, tags: list[str] = ()) -> Testcase:
+        """ Write a new testcase after the last one. """
+        return self.put(self.next_index(), input, answer, origin, tags)
+
+    def next_index(self) -> int:
+        return max(self.testcases, default=0) + 1
+
+    def sync(self) -> bool:
+        """ Match the manifest with the directory: add tests created by hand as custom,
+        rehash edited ones, and drop the ones whose files are gone. Return whether changed.
+        """
+        stats = {}
+        with os.scandir(self._dir) as it:
+            for entry in it:
+                if entry.name.startswith(('in', 'ans')) and entry.name.endswith('.txt'):
+                    stats[entry.name] = entry.stat()
+        changed = False
+        for idx in list(self.testcases):
+            t = self.testcases[idx]
+            if t.input not in stats or t.answer not in stats:
+                logger.info("Testcase %d is gone, removing it from the manifest", idx)
+                del self.testcases[idx]
+                changed = True
+        for name in stats:
+            m = TESTCASE_PATTERN.fullmatch(name)
+            if not m or f"ans{m.group(1)}.txt" not in stats:
+                continue
+            idx = int(m.group(1))
+            input_stat, answer_stat = stats[name], stats[f"ans{idx}.txt"]
+            t = self.testcases.get(idx)
+            if t and (t.input_size, t.answer_size, t.mtime_ns) == (
+                input_stat.st_size, answer_stat.st_size,
+                max(input_stat.st_mtime_ns, answer_stat.st_mtime_ns),
+            ):
+                continue
+            if t:
+                logger.info("Testcase %d is modified, rehashing it", idx)
+                self._record(idx, TestOrigin(t.origin), t.tags)
+            else:
+                logger.info("Found new testcase %d", idx)
+                self._record(idx, TestOrigin.CUSTOM, [])
+            changed = True
+        return changed
+
+    def select(self, indices: set[int] | None = None,
+               tags: list[str] | None = None) -> list[Testcase]:
+        """ Testcases in index order, filtered by indices and by having any of the tags. """
+        return [
+            t for t in self.sorted()
+            if (indices is None or t.idx in indices) and
+            (not tags or any(tag in t.tags for tag in tags))
+        ]
@@ -55,8 +55,29 @@ class ProblemPage:
 
 def parse_problem_page_from_html(html: str) -> ProblemPage:
     tree = etree.parse(StringIO(html), etree.HTMLParser())
-    problem_root = from_list1(tree.xpath("//div[@class='problem-statement']"))
+    return parse_problem_statement(from_list1(tree.xpath("//div[@class='problem-statement']")))
 
+def parse_problems_page_from_html(html: str) -> dict[str, ProblemPage | None]:
+    """ Parse every problem on the complete problemset page of a contest (/problems),
+    by problem index like A, B, C1. Problems that fail to parse are None.
+    """
+    tree = etree.parse(StringIO(html), etree.HTMLParser())
+    problems = {}
+    for holder in tree.xpath("//div[@problemindex]"):
+        idx = holder.get('problemindex').strip()
+        try:
+            problems[idx] = parse_problem_statement(
+                from_list1(holder.xpath(".//div[@class='problem-statement']")))
+        except Exception as e:
+            logger.exception(e)
+            logger.warning("Cannot parse problem %s from the problems page", idx)
+            problems[idx] = None
+    logger.info("Parsed %d problems from the problems page",
+                sum(page is not None for page in problems.values()))
+    return problems
+
+def parse_problem_statement(problem_root: etree._Element) -> ProblemPage:
+    """ Parse a problem from its div with class problem-statement. """
     # Title
     title = from_list1(problem_root.xpath("./div[@class='header']/div[@class='title']/text()")).strip()
 
@@ -138,7 +159,7 @@ def parse_problem_page_from_html(html: str) -> ProblemPage:
 
     # Sample testcases
     testcases = []
-    sample_div = tree.xpath("//div[@class='sample-tests']")[0]
+    sample_div = problem_root.xpath(".//div[@class='sample-tests']")[0]
     for input_div, output_div in \
             zip(sample_div.xpath(".//div[@class='input']"),
                 sample_div.xpath(".//div[@class='output']")):
@@ -150,7 +171,7 @@ def parse_problem_page_from_html(html: str) -> ProblemPage:
 
         testcases.append((input_text, answer_text))
 
-    logger.info("Parsed problem from html: %s", title)
+    logger.info("Parsed problem: %s", title)
     return ProblemPage(
         time_limit=time_limit,
         memory_limit=memory_limit,
@@ -165,6 +186,18 @@ def parse_problem_page_from_html(html: str) -> ProblemPage:
         root_element=problem_root,
     )
 
+def parse_float_tolerance(output_spec: str) -> float | None:
+    """ Parse the allowed error from sentences like "Your answer is considered correct if its
+    absolute or relative error does not exceed $10^{-6}$". Return None if not found.
+    """
+    if not re.search(r'(absolute|relative) error', output_spec, flags=re.IGNORECASE):
+        return None
+    m = re.search(r'10\^\{?\s*-\s*(\d+)\s*\}?', output_spec)
+    if not m:
+        logger.warning("Found absolute or relative error but cannot parse the value")
+        return None
+    return 10 ** -int(m.group(1))
+
 def parse_handle_from_html(html: str) -> str:
     """ Parse the username from html, throw an error if not logged in """
     # handle is in javascript; accepts alphanumeric, underscore and dash
@@ -28,7 +28,10 @@ class CFProblem:
             url: something like https://codeforces.com/contest/2092/problem/A
             web_parser: a function that accepts a url string and returns the HTML
         """
-        problem_page = parse_problem_page_from_html(web_parser(url))
+        return cls.from_problem_page(url, parse_problem_page_from_html(web_parser(url)))
+
+    @classmethod
+    def from_problem_page(cls, url: str, problem_page: ProblemPage):
         return cls(
             url=url,
             problem_type=problem_page.problem_type,
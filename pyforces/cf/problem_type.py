@@ -2,6 +2,6 @@ from enum import Enum
 
 class ProblemType(Enum):
     TRADITIONAL = 0  # default, most problems
-    SPECIAL_JUDGE = 1  # not supported
-    INTERACTIVE = 2  # support parsing but not judging
+    SPECIAL_JUDGE = 1  # judged with a user-supplied checker
+    INTERACTIVE = 2  # judged with a user-supplied interactor
     COMMUNICATION = 3  # not supported
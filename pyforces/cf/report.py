@@ -0,0 +1,131 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import json
+from pathlib import Path
+from logging import getLogger
+
+from pyforces.cf.execute import ExecuteResult
+
+logger = getLogger(__name__)
+
+MIN_TIME_REGRESSION = 0.02  # seconds, smaller changes are noise
+MIN_MEMORY_REGRESSION = 1 << 20  # bytes
+
+
+@dataclass
+class TestRecord:
+    """ The outcome of one testcase in a run of pyforces test. """
+    idx: int
+    input: str
+    passed: bool
+    cached: bool  # replayed from the result cache
+    runs: list[ExecuteResult]  # more than one with --repeat
+
+    @property
+    def time(self) -> float:
+        """ CPU time (wall time without --poll), the median with --repeat. """
+        import statistics
+        return statistics.median(r.execution_time for r in self.runs)
+
+    @property
+    def peak_memory(self) -> int | None:
+        peaks = [r.peak_memory for r in self.runs if r.peak_memory and r.peak_memory > 0]
+        return max(peaks) if peaks else None
+
+    def to_dict(self) -> dict:
+        return {
+            'idx': self.idx,
+            'input': self.input,
+            'passed': self.passed,
+            'cached': self.cached,
+            'time': self.time,
+            'peak_memory': self.peak_memory,
+            'runs': [asdict(r) for r in self.runs],
+        }
+
+
+def run_summary(records: list[TestRecord], meta: dict) -> dict:
+    """ One run of pyforces test as a JSON-serializable dict. """
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        **meta,
+        'passed': sum(r.passed for r in records),
+        'failed': sum(not r.passed for r in records),
+        'tests': [r.to_dict() for r in records],
+    }
+
+def write_json(path: Path, summary: dict):
+    with path.open('w') as fp:
+        json.dump(summary, fp, indent=4)
+
+def write_junit(path: Path, records: list[TestRecord], suite_name: str):
+    """ JUnit XML, one testcase per record, every ExecuteResult field as a property. """
+    from xml.etree import ElementTree as ET
+    suite = ET.Element(
+        'testsuite', name=suite_name, tests=str(len(records)),
+        failures=str(sum(not r.passed for r in records)),
+        time=f"{sum(r.time for r in records):.3f}",
+    )
+    for record in records:
+        case = ET.SubElement(suite, 'testcase', name=f"#{record.idx}", classname=suite_name,
+                             time=f"{record.time:.3f}")
+        properties = ET.SubElement(case, 'properties')
+        ET.SubElement(properties, 'property', name='cached', value=str(record.cached))
+        for field, value in asdict(record.runs[-1]).items():
+            ET.SubElement(properties, 'property', name=field, value=str(value))
+        if not record.passed:
+            ET.SubElement(case, 'failure', message=record.runs[-1].reason)
+    ET.ElementTree(suite).write(path, encoding='utf-8', xml_declaration=True)
+
+
+class History:
+    """ Append-only history of test runs of a problem, one JSON line per run, in
+    `.pyforces/history.jsonl` under the problem directory.
+    """
+
+    def __init__(self, history_file: Path):
+        self._history_file = history_file
+
+    @classmethod
+    def from_dir(cls, path: Path):
+        return cls(path / '.pyforces' / 'history.jsonl')
+
+    def last(self) -> dict | None:
+        """ The latest run, None if there's none. """
+        try:
+            with self._history_file.open('rb') as fp:
+                lines = fp.read().splitlines()
+        except FileNotFoundError:
+            return None
+        for line in reversed(lines):
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping a broken line in %s", self._history_file)
+        return None
+
+    def append(self, summary: dict):
+        self._history_file.parent.mkdir(exist_ok=True)
+        with self._history_file.open('a') as fp:
+            fp.write(json.dumps(summary) + '\n')
+
+
+def find_regressions(last: dict, records: list[TestRecord], threshold: float) -> list[str]:
+    """ Describe the tests whose time or peak memory grew by more than threshold (a ratio)
+    since the last run. Changes below MIN_TIME_REGRESSION/MIN_MEMORY_REGRESSION are ignored.
+    """
+    last_tests = {t['idx']: t for t in last['tests']}
+    regressions = []
+    for record in records:
+        before = last_tests.get(record.idx)
+        if before is None or not record.passed or not before['passed']:
+            continue
+        t0, t1 = before['time'], record.time
+        if t1 - t0 > max(MIN_TIME_REGRESSION, t0 * threshold):
+            regressions.append(f"#{record.idx} time {t0:.2f}s -> {t1:.2f}s"
+                               + (f" ({(t1-t0)/t0:+.0%})" if t0 else ""))
+        m0, m1 = before['peak_memory'], record.peak_memory
+        if m0 and m1 and m1 - m0 > max(MIN_MEMORY_REGRESSION, m0 * threshold):
+            regressions.append(f"#{record.idx} memory {m0/1024/1024:.2f}MB -> "
+                               f"{m1/1024/1024:.2f}MB ({(m1-m0)/m0:+.0%})")
+    return regressions
@@ -0,0 +1,80 @@
+from dataclasses import asdict
+import hashlib
+import json
+from pathlib import Path
+from logging import getLogger
+
+from pyforces.cf.build import file_hash
+from pyforces.cf.execute import ExecuteResult
+
+logger = getLogger(__name__)
+
+MAX_ENTRIES = 1000  # oldest entries are dropped beyond this
+
+
+def program_fingerprint(args: str | list[str]) -> str:
+    """ Hash of a program given as args: the content of every arg that is a file (the
+    executable, the interpreter and the script), and the others as they are.
+    Modules imported by a script are not covered.
+    """
+    if isinstance(args, str):
+        args = [args]
+    h = hashlib.sha256()
+    for arg in args:
+        path = Path(arg)
+        h.update(file_hash(path).encode() if path.is_file() else arg.encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class ResultCache:
+    """ Results of previous runs, stored in `.pyforces/results.json` under the problem
+    directory, keyed by the solution, the testcase and everything else that affects the
+    verdict. Timeouts are not cached, they depend on the machine's load.
+    """
+
+    def __init__(self, entries: dict[str, dict], cache_file: Path):
+        self.entries = entries
+        self._cache_file = cache_file
+
+    @classmethod
+    def from_dir(cls, path: Path):
+        cache_file = path / '.pyforces' / 'results.json'
+        try:
+            with cache_file.open() as fp:
+                entries = json.load(fp)
+        except FileNotFoundError:
+            entries = {}
+        except json.JSONDecodeError:
+            logger.error("Result cache %s is broken, ignoring it", cache_file)
+            entries = {}
+        return cls(entries, cache_file)
+
+    @staticmethod
+    def key(solution: str, input_hash: str, answer_hash: str, settings: dict) -> str:
+        """ settings: limits, compare mode, checker, etc., must be JSON serializable. """
+        return hashlib.sha256(json.dumps(
+            [solution, input_hash, answer_hash, settings], sort_keys=True,
+        ).encode()).hexdigest()
+
+    def get(self, key: str) -> ExecuteResult | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        try:
+            return ExecuteResult(**entry)
+        except TypeError:  # written by another version
+            return None
+
+    def put(self, key: str, result: ExecuteResult):
+        if result.timeout:
+            return
+        self.entries.pop(key, None)  # move to the end, as the newest
+        self.entries[key] = asdict(result)
+        while len(self.entries) > MAX_ENTRIES:
+            del self.entries[next(iter(self.entries))]
+
+    def save(self):
+        self._cache_file.parent.mkdir(exist_ok=True)
+        with self._cache_file.open('w') as fp:
+            json.dump(self.entries, fp)
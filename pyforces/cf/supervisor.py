@@ -0,0 +1,313 @@
+import math
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from logging import getLogger
+from typing import IO, TYPE_CHECKING
+
+from pyforces.cf.limits import HAS_PRLIMIT, MemoryLimiter
+from pyforces.cf.timeline import ProcessTimeline
+
+if TYPE_CHECKING:  # imported by whoever starts one, it's not needed otherwise
+    from pyforces.cf.forkserver import ForkServer
+
+if os.name == 'posix':
+    import resource
+
+logger = getLogger(__name__)
+
+READER_GRACE = 1.0  # seconds to wait for the output past the deadline, once it's exited
+
+@dataclass
+class ProcessUsage:
+    return_code: int
+    user_time: float  # in seconds
+    sys_time: float  # in seconds
+    wall_time: float  # in seconds
+    peak_memory: int  # in bytes, -1 if unknown
+    killed: bool  # killed by CPU or wall-clock limit
+    memory_exceeded: bool  # killed by the kernel, or failed to allocate beyond the limit
+    stdout: str | bytes | None  # None if not captured
+    stderr: str | bytes | None
+
+    @property
+    def cpu_time(self) -> float:
+        return self.user_time + self.sys_time
+
+
+class SupervisedProcess:
+    """ Run a program and wait on its exit instead of polling it.
+    The CPU limit is enforced by the kernel (RLIMIT_CPU), the wall-clock limit by a timer.
+    On Unix, the memory limit (if given) is enforced by MemoryLimiter, user/sys time come
+    from wait4() when reaping the process, and peak memory from the cgroup or wait4().
+    On Linux, there's no preexec_fn, which is unsafe with other threads running (like with
+    -j): the memory limit is set by MemoryLimiter.wrap, the rest from the parent.
+    On Unix, the program runs in its own session, and the whole process group is killed on
+    the deadline and once it exits, so that nothing it started (like the program under a
+    --shell command) outlives the run or keeps its output pipes open.
+    On Windows, they are read with psutil right after the process exits.
+    """
+
+    _live: set['SupervisedProcess'] = set()  # not reaped yet, for kill_all
+    _live_lock = threading.Lock()
+
+    def __init__(
+        self,
+        args: str | list[str],
+        shell: bool,
+        stdin: IO | int | None,
+        cpu_limit: float,  # in seconds
+        wall_limit: float,  # in seconds
+        stdout: IO | int | None = subprocess.PIPE,
+        stderr: IO | int | None = subprocess.PIPE,
+        text: bool = True,
+        memory_limit: int | None = None,  # in bytes, None to not enforce
+        forkserver: 'ForkServer | None' = None,  # if set, args and shell are ignored
+        cpu: int | None = None,  # pin the program to this CPU (Linux only)
+        timeline: ProcessTimeline | None = None,  # sample the program into it (Linux only)
+        cancel: threading.Event | None = None,  # if set, kill_all may have missed it
+    ):
+        self.cpu_limit = cpu_limit
+        self.cpu = cpu if hasattr(os, 'sched_setaffinity') else None
+        self.wall_limit = wall_limit
+        self.killed = False
+        self._exited = False
+        self._lock = threading.Lock()
+
+        self.limiter = None
+        if os.name == 'posix' and memory_limit is not None:
+            self.limiter = MemoryLimiter(memory_limit)
+        needs_preexec = os.name == 'posix' and not HAS_PRLIMIT
+        self.forked = forkserver is not None
+        try:
+            if self.forked:
+                self.proc = self._spawn_forked(forkserver, stdin, stdout, stderr, text)
+            else:
+                if HAS_PRLIMIT and self.limiter:
+                    args, shell = self.limiter.wrap(args, shell), False
+                self.proc = subprocess.Popen(
+                    args,
+                    shell=shell,
+                    stdin=stdin,
+                    stdout=stdout,
+                    stderr=stderr,
+                    text=text,
+                    preexec_fn=self._preexec if needs_preexec else None,
+                    start_new_session=os.name == 'posix',
+                )
+            if HAS_PRLIMIT and not self.forked:
+                self._apply_limits()
+        except Exception:
+            if self.limiter:
+                self.limiter.close()
+            raise
+        self.start_time = time.perf_counter()
+        self.timeline = timeline
+        if timeline is not None:
+            timeline.attach(self.proc.pid)
+        with self._live_lock:
+            self._live.add(self)
+            # Under the same lock as kill_all, so a run that's cancelled (cancel set, then
+            # kill_all) right as it starts is killed either way
+            cancelled = cancel is not None and cancel.is_set()
+        if cancelled:
+            self.kill()
+
+        if os.name == 'nt':
+            try:
+                import psutil
+                self._ps = psutil.Process(self.proc.pid)
+            except Exception as e:
+                logger.info("Stats tracking error %s", e)
+                self._ps = None
+
+        # Drain the pipes in background, otherwise a large output blocks the program
+        self._outputs = {}
+        self._readers = [
+            threading.Thread(target=self._read, args=(name, fp), daemon=True)
+            for name, fp in (('stdout', self.proc.stdout), ('stderr', self.proc.stderr))
+            if fp is not None
+        ]
+        for reader in self._readers:
+            reader.start()
+
+        self._timer = threading.Timer(wall_limit, self._on_deadline)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _spawn_forked(self, forkserver: 'ForkServer', stdin, stdout, stderr, text: bool):
+        """ Ask the fork server for a child, with the same stdio handling as Popen.
+        Limits are applied by the child itself before running the solution.
+        """
+        own_fds = []  # the child's ends, to close after sending them
+        readers = {}
+        fds = []
+        for name, target in (('stdin', stdin), ('stdout', stdout), ('stderr', stderr)):
+            if target == subprocess.PIPE:
+                r, w = os.pipe()
+                readers[name] = open(r, 'r' if text else 'rb', closefd=True)
+                own_fds.append(w)
+                fds.append(w)
+            elif target is None or target == subprocess.DEVNULL:
+                fd = os.open(os.devnull, os.O_RDWR)
+                own_fds.append(fd)
+                fds.append(fd)
+            elif isinstance(target, int):
+                fds.append(target)
+            else:
+                fds.append(target.fileno())
+        limits = {'cpu_limit': max(1, math.ceil(self.cpu_limit))}
+        if self.limiter:
+            limits['memory_limit'] = self.limiter.memory_limit
+            limits['cgroup'] = self.limiter.cgroup and str(self.limiter.cgroup)
+        if self.cpu is not None:
+            limits['cpu'] = self.cpu
+        try:
+            return forkserver.spawn(*fds, limits=limits, stdout_reader=readers.get('stdout'),
+                                    stderr_reader=readers.get('stderr'))
+        finally:
+            for fd in own_fds:
+                os.close(fd)
+
+    def _apply_limits(self):
+        """ Limit the just started program from the parent. """
+        pid = self.proc.pid
+        soft = max(1, math.ceil(self.cpu_limit))
+        try:
+            # SIGXCPU at the soft limit, SIGKILL one second later
+            resource.prlimit(pid, resource.RLIMIT_CPU, (soft, soft + 1))
+        except OSError as e:
+            logger.info("Cannot set CPU limit: %s", e)
+        if self.cpu is not None:
+            try:
+                os.sched_setaffinity(pid, {self.cpu})
+            except OSError:
+                pass  # e.g. not in our cpuset, run unpinned
+
+    def _preexec(self):
+        """ Runs in the child between fork and exec, where there's no prlimit (e.g. Mac). """
+        if self.limiter:
+            self.limiter.preexec()
+        soft = max(1, math.ceil(self.cpu_limit))
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+
+    def _read(self, name: str, fp: IO):
+        self._outputs[name] = fp.read()
+        fp.close()
+
+    def _on_deadline(self):
+        logger.info("Wall-clock deadline %.2fs reached", self.wall_limit)
+        self.kill()
+
+    @classmethod
+    def kill_all(cls):
+        """ Kill every supervised program still running, like stale runs in watch mode.
+        Set their cancel event first, to also kill the ones starting concurrently.
+        """
+        with cls._live_lock:
+            live = list(cls._live)
+        for proc in live:
+            proc.kill()
+
+    def kill(self):
+        """ Kill the program if it's still running, safe to call from other threads. """
+        with self._lock:
+            if self._exited:
+                return
+            self.killed = True
+            if os.name == 'posix' and not self.forked:
+                self._kill_group()
+            else:
+                self.proc.kill()
+
+    def _kill_group(self):
+        """ Kill the program and everything it started. Only while it's not reaped, so that
+        the group id can't be of someone else.
+        """
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def wait(self) -> ProcessUsage:
+        """ Block until the program exits, then collect its usage. """
+        if self.forked:
+            # The fork server reaps it, and kills through a pidfd
+            status, rusage = self.proc.wait4()
+            with self._lock:
+                self._exited = True
+            if self.timeline is not None:
+                self.timeline.stop()
+        elif os.name == 'posix':
+            # Wait without reaping, so that kill() never signals a recycled pid
+            os.waitid(os.P_PID, self.proc.pid, os.WEXITED | os.WNOWAIT)
+            with self._lock:
+                self._exited = True
+                self._kill_group()  # whatever it left behind
+            if self.timeline is not None:
+                self.timeline.stop()  # the last sample is of the exited, unreaped program
+            _, status, rusage = os.wait4(self.proc.pid, 0)
+        if os.name == 'posix':
+            wall_time = time.perf_counter() - self.start_time
+            self.proc.returncode = os.waitstatus_to_exitcode(status)
+            user_time = rusage.ru_utime
+            sys_time = rusage.ru_stime
+            # ru_maxrss also counts the forked python before exec, so prefer the cgroup's
+            peak_memory = self.limiter and self.limiter.peak()
+            if peak_memory is None:
+                peak_memory = rusage.ru_maxrss
+                if sys.platform != 'darwin':
+                    peak_memory *= 1024  # on Linux it's KB
+            limiter = self.limiter
+        else:
+            self.proc.wait()
+            wall_time = time.perf_counter() - self.start_time
+            with self._lock:
+                self._exited = True
+            user_time = sys_time = 0.
+            peak_memory = -1
+            limiter = None
+            if self._ps is not None:
+                try:  # the process handle is still held by Popen
+                    cpu_times = self._ps.cpu_times()
+                    user_time, sys_time = cpu_times.user, cpu_times.system
+                    peak_memory = self._ps.memory_info().peak_wset
+                except Exception as e:
+                    logger.info("Stats tracking error %s", e)
+
+        with self._live_lock:
+            self._live.discard(self)
+        self._timer.cancel()
+        # Something that left the group may still hold the pipes, don't wait for it forever
+        deadline = self.start_time + self.wall_limit + READER_GRACE
+        for reader in self._readers:
+            reader.join(max(deadline - time.perf_counter(), 0))
+            if reader.is_alive():
+                logger.warning("The output of the program is still open after it exited, "
+                               "ignoring the rest")
+        memory_exceeded = False
+        if limiter:  # after reading stderr, which may tell a failed allocation
+            memory_exceeded = limiter.exceeded(
+                self.proc.returncode, peak_memory, self._outputs.get('stderr'))
+            limiter.close()
+        if user_time + sys_time > self.cpu_limit or os.name == 'posix' and \
+                self.proc.returncode in (-signal.SIGXCPU, 128 + signal.SIGXCPU):
+            self.killed = True  # reached RLIMIT_CPU, a shell reports it as 128 + SIGXCPU
+
+        logger.info("Program exited with code %d after %.2fs user, %.2fs sys, %.2fs wall",
+                    self.proc.returncode, user_time, sys_time, wall_time)
+        return ProcessUsage(
+            return_code=self.proc.returncode,
+            user_time=user_time,
+            sys_time=sys_time,
+            wall_time=wall_time,
+            peak_memory=peak_memory,
+            killed=self.killed,
+            memory_exceeded=memory_exceeded,
+            stdout=self._outputs.get('stdout'),
+            stderr=self._outputs.get('stderr'),
+        )
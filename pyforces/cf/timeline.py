@@ -0,0 +1,141 @@
+import os
+import sys
+import threading
+import time
+from logging import getLogger
+from pathlib import Path
+
+logger = getLogger(__name__)
+
+COLUMNS = (
+    'time', 'rss', 'user_time', 'sys_time', 'minor_faults', 'major_faults',
+    'voluntary_switches', 'involuntary_switches', 'read_bytes', 'write_bytes',
+)
+
+SPIKE_WINDOW = 0.2  # seconds, RSS growth faster than this is a spike
+
+if sys.platform == 'linux':
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+class ProcessTimeline:
+    """ Sample a running program from /proc every interval seconds, in a background thread:
+    RSS, user/sys time, page faults, context switches and bytes read/written (through
+    read/write calls, so pipes count too). Linux only.
+    Each sample is a tuple of COLUMNS, time in seconds since attach(), sizes in bytes.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: list[tuple] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform == 'linux'
+
+    def attach(self, pid: int):
+        """ Start sampling pid, until it exits or stop(). """
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(pid,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stop sampling, taking a last sample if the program is not reaped yet. """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, pid: int):
+        while True:
+            stopping = self._stop.is_set()
+            try:
+                self.samples.append(self._sample(pid))
+            except (OSError, ValueError, IndexError):
+                break  # exited and reaped
+            if stopping or self._stop.wait(self.interval):
+                break
+
+    def _sample(self, pid: int) -> tuple:
+        t = time.perf_counter() - self._start
+        with open(f'/proc/{pid}/stat', 'rb') as fp:
+            # The command name may contain spaces, fields start after its ')'
+            fields = fp.read().rsplit(b')', 1)[1].split()
+        with open(f'/proc/{pid}/status', 'rb') as fp:
+            status = dict(line.split(b':', 1) for line in fp.read().splitlines())
+        try:
+            with open(f'/proc/{pid}/io', 'rb') as fp:
+                io = dict(line.split(b':', 1) for line in fp.read().splitlines())
+            rchar, wchar = int(io[b'rchar']), int(io[b'wchar'])
+        except PermissionError:  # e.g. a setuid program
+            rchar = wchar = 0
+        return (
+            round(t, 6),
+            int(fields[21]) * PAGE_SIZE,
+            int(fields[11]) / CLOCK_TICKS,
+            int(fields[12]) / CLOCK_TICKS,
+            int(fields[7]),
+            int(fields[9]),
+            int(status.get(b'voluntary_ctxt_switches', 0)),
+            int(status.get(b'nonvoluntary_ctxt_switches', 0)),
+            rchar,
+            wchar,
+        )
+
+    def write_csv(self, path: Path):
+        import csv
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(COLUMNS)
+            writer.writerows(self.samples)
+
+    def summary(self) -> list[str]:
+        """ Totals of the run, and hints at what it spent its time on. """
+        if not self.samples:
+            return ["No samples, the program exited too fast"]
+        last = dict(zip(COLUMNS, self.samples[-1]))
+        peak = max(self.samples, key=lambda s: s[1])
+        wall = max(last['time'], self.interval)
+        cpu = last['user_time'] + last['sys_time']
+        # The largest RSS increase within SPIKE_WINDOW
+        jump, jump_at = 0, 0.
+        lo = 0
+        for i, sample in enumerate(self.samples):
+            while sample[0] - self.samples[lo][0] > SPIKE_WINDOW:
+                lo += 1
+            low = min(s[1] for s in self.samples[lo:i+1])
+            if sample[1] - low > jump:
+                jump, jump_at = sample[1] - low, sample[0]
+        mb = 1024 * 1024
+        lines = [
+            f"{len(self.samples)} samples, peak RSS {peak[1]/mb:.2f}MB at {peak[0]:.3f}s, "
+            f"CPU {cpu:.2f}s ({last['sys_time']:.2f}s sys) in {wall:.2f}s wall",
+            f"Page faults {last['minor_faults']} minor, {last['major_faults']} major; "
+            f"context switches {last['voluntary_switches']} voluntary, "
+            f"{last['involuntary_switches']} involuntary; "
+            f"read {last['read_bytes']/mb:.2f}MB, written {last['write_bytes']/mb:.2f}MB",
+        ]
+
+        if jump > peak[1] / 2 and jump > 16 * mb:
+            lines.append(f"Allocation spike: RSS grew {jump/mb:.2f}MB within "
+                         f"{SPIKE_WINDOW*1000:.0f}ms, up to {jump_at:.3f}s")
+        # Touching fresh memory costs about one minor fault per page
+        if last['minor_faults'] * PAGE_SIZE > 4 * max(peak[1], 16 * mb):
+            lines.append("Memory churn: far more page faults than the peak RSS needs, "
+                         "memory is repeatedly freed to and taken back from the system")
+        if last['major_faults'] > 100:
+            lines.append("Major page faults: pages are read from disk (swap or mapped files)")
+        if cpu and last['sys_time'] > cpu * 0.3:
+            lines.append("Kernel heavy: over 30% of CPU time is sys time, "
+                         "from page faults or many small reads/writes")
+        if wall > 0.1 and cpu < wall * 0.5:
+            lines.append(f"Off-CPU {1 - cpu/wall:.0%} of the time: "
+                         "blocked on I/O, sleeping, or waiting for a CPU")
+        # Sampling itself preempts the program about once per interval on a busy CPU
+        if last['involuntary_switches'] > wall * max(500, 2 / self.interval):
+            lines.append("CPU contention: preempted often, other processes (or parallel "
+                         "tests, try -j 1) compete for the CPU")
+        return lines
@@ -0,0 +1,95 @@
+import math
+import os
+import statistics
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+
+from pyforces.cf.execute import ExecuteResult
+
+logger = getLogger(__name__)
+
+# Two-sided 95% quantiles of Student's t distribution, by degrees of freedom
+T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+def pick_timing_cpu() -> int | None:
+    """ A CPU to pin timing runs to: the first isolated one (isolcpus=), else the last one
+    we're allowed on, as CPU 0 usually takes the most interrupts. None if not supported.
+    """
+    if not hasattr(os, 'sched_getaffinity'):
+        return None
+    allowed = os.sched_getaffinity(0)
+    try:
+        isolated = Path('/sys/devices/system/cpu/isolated').read_text().strip()
+    except OSError:
+        isolated = ''
+    for part in filter(None, isolated.split(',')):
+        first = int(part.split('-')[0])
+        logger.info("Using isolated CPU %d", first)
+        return first  # not in the default affinity mask, but can be pinned to
+    return max(allowed)
+
+def percentile(values: list[float], p: float) -> float:
+    """ Linear interpolation between closest ranks, like numpy's default. """
+    values = sorted(values)
+    k = (len(values) - 1) * p
+    lo, hi = math.floor(k), math.ceil(k)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+@dataclass
+class Spread:
+    min: float
+    median: float
+    p95: float
+
+    @classmethod
+    def of(cls, values: list[float]):
+        return cls(min(values), statistics.median(values), percentile(values, 0.95))
+
+    def __str__(self):
+        return f"min {self.min:.3f}s  median {self.median:.3f}s  p95 {self.p95:.3f}s"
+
+
+@dataclass
+class TimingStats:
+    """ Statistics of repeated runs of one testcase. The verdict uses CPU time (user+sys). """
+    runs: int
+    user: Spread
+    sys: Spread
+    wall: Spread
+    cpu_mean: float
+    cpu_stdev: float
+    cpu_ci: tuple[float, float]  # 95% confidence interval of the mean CPU time
+    at_risk: bool  # the interval crosses the time limit
+
+    @classmethod
+    def from_results(cls, results: list[ExecuteResult], time_limit: float):
+        cpu = [r.user_time + r.sys_time for r in results]
+        mean = statistics.fmean(cpu)
+        stdev = statistics.stdev(cpu) if len(cpu) > 1 else 0.
+        t = T_95[len(cpu) - 2] if len(cpu) - 2 < len(T_95) else 1.96
+        half = t * stdev / math.sqrt(len(cpu))
+        return cls(
+            runs=len(results),
+            user=Spread.of([r.user_time for r in results]),
+            sys=Spread.of([r.sys_time for r in results]),
+            wall=Spread.of([r.wall_time for r in results]),
+            cpu_mean=mean,
+            cpu_stdev=stdev,
+            cpu_ci=(mean - half, mean + half),
+            at_risk=mean - half <= time_limit < mean + half,
+        )
+
+    def report(self) -> str:
+        return '\n'.join([
+            f"    user  {self.user}",
+            f"    sys   {self.sys}",
+            f"    wall  {self.wall}",
+            f"    cpu   mean {self.cpu_mean:.3f}s  stdev {self.cpu_stdev:.3f}s  "
+            f"95% CI [{self.cpu_ci[0]:.3f}s, {self.cpu_ci[1]:.3f}s]",
+        ])
@@ -1,15 +1,24 @@
 import json
 from pathlib import Path
+import random
+import time
 from logging import getLogger
 
 from pyforces.cf.problem import CFProblem
 from pyforces.cf.parser import *
+from pyforces.daemon import DaemonSession
+from pyforces.http_cache import CachedResponse, HttpCache
 from pyforces.utils import parse_firefox_http_headers
 
 logger = getLogger(__name__)
 
+RETRY_STATUS = (403, 429, 502, 503, 504)  # Cloudflare challenges and overloaded servers
+
 class Client:
-    """ This client sends any HTTP requests with cloudscraper, with custom HTTP headers. """
+    """ This client sends any HTTP requests with cloudscraper, with custom HTTP headers.
+    If the pyforces daemon is running, they are sent through its session instead.
+    Pages like problem statements are cached on disk, see pyforces.http_cache.
+    """
     
     def __init__(
         self,
@@ -19,23 +28,97 @@ class Client:
         _root: Path,
         _headers_file: Path,
         _csrf_token_file: Path,
+        session: DaemonSession | None = None,
+        cache: HttpCache | None = None,
+        cookies: list[dict] | None = None,
+        _cookies_file: Path | None = None,
+        host: str | None = None,
+        prefer_saved_cookies: bool = False,
     ):
-        import cloudscraper
-        self.scraper = cloudscraper.create_scraper(
-            # debug=all(handler.level <= logging.DEBUG for handler in logging.handlers)
-            debug=False  # TODO: log the request and response
-        )
-        self.headers = headers
+        if session is not None:
+            self.scraper = session
+        else:
+            import cloudscraper
+            self.scraper = cloudscraper.create_scraper(
+                # debug=all(handler.level <= logging.DEBUG for handler in logging.handlers)
+                debug=False  # TODO: log the request and response
+            )
+        self.host = host
+        if prefer_saved_cookies:
+            # Saved after the headers, the login cookies may have been rotated since
+            self.headers = headers
+            self._load_cookies(cookies or [])
+        else:
+            self._load_cookies(cookies or [])
+            self.headers = headers
         self.csrf_token = csrf_token
         self.handle = handle
         self._root = _root
         self._headers_file = _headers_file
         self._token_file = _csrf_token_file
+        self._cookies_file = _cookies_file
+        self.cache = cache
+
+    @property
+    def cookie_jar(self):
+        """ The session's cookies, None if they're held by the daemon. """
+        return getattr(self.scraper, 'cookies', None)
+
+    @property
+    def headers(self) -> dict[str, str] | None:
+        """ Headers sent with every request, without the Cookie header. """
+        return self._headers
+
+    @headers.setter
+    def headers(self, headers: dict[str, str] | None):
+        # requests doesn't send the cookie jar if there's a Cookie header, so the cookies set
+        # by responses (Cloudflare's cf_clearance, rotated session cookies) would never be
+        # sent. Move the login cookies to the jar, they're saved with it. The daemon loaded
+        # them into its own jar when it started.
+        self._login_headers = headers  # as given, saved to headers.txt
+        if headers and 'Cookie' in headers:
+            headers = dict(headers)
+            for cookie in headers.pop('Cookie').split(';'):
+                name, _, value = cookie.strip().partition('=')
+                if name and self.cookie_jar is not None:
+                    self._set_cookie(name, value, domain=self.cookie_domain)
+        self._headers = headers
+
+    @property
+    def cookie_domain(self) -> str:
+        """ Domain of the login cookies, the same as the host's own cookies, so that a rotated
+        one replaces it instead of being sent alongside it.
+        """
+        if not self.host:
+            return ''
+        from urllib.parse import urlparse
+        return urlparse(self.host).hostname or ''
+
+    def _set_cookie(self, name: str, value: str, **kwargs):
+        """ Set a cookie, replacing the ones with the same name. """
+        for cookie in list(self.cookie_jar):
+            if cookie.name == name:
+                self.cookie_jar.clear(cookie.domain, cookie.path, cookie.name)
+        self.cookie_jar.set(name, value, **kwargs)
+
+    def _load_cookies(self, cookies: list[dict]):
+        if self.cookie_jar is None:
+            return
+        now = time.time()
+        loaded = 0
+        for cookie in cookies:
+            if cookie.get('expires') is not None and cookie['expires'] <= now:
+                logger.info("Cookie %s has expired", cookie['name'])
+                continue
+            self._set_cookie(**cookie)
+            loaded += 1
+        logger.info("Loaded %d cookies", loaded)
     
     @classmethod
-    def from_path(cls, path: Path):
+    def from_path(cls, path: Path, use_daemon: bool = True, host: str | None = None):
         headers_file = path / 'headers.txt'
         token_file = path / 'csrf_token_and_handle.txt'
+        cookies_file = path / 'cookies.json'
         try:
             with headers_file.open() as fp:
                 headers = json.load(fp)
@@ -66,6 +149,24 @@ class Client:
             csrf_token = None
             handle = None
 
+        try:
+            with cookies_file.open() as fp:
+                cookies = json.load(fp)
+        except FileNotFoundError:
+            logger.info("%s not found", cookies_file)
+            cookies = None
+        except json.JSONDecodeError:
+            logger.error("%s decode error, this should not happen!", cookies_file)
+            cookies = None
+        # The Cookie header wins only if headers.txt was edited after the cookies were saved
+        prefer_saved_cookies = cookies is not None and headers_file.is_file() and \
+            cookies_file.stat().st_mtime >= headers_file.stat().st_mtime
+
+        session = DaemonSession.connect() if use_daemon else None
+        if session is not None:
+            logger.info("Sending requests through the pyforces daemon")
+            cookies = None  # it has its own
+
         return cls(
             headers=headers,
             csrf_token=csrf_token,
@@ -73,6 +174,12 @@ class Client:
             _root=path,
             _headers_file=headers_file,
             _csrf_token_file=token_file,
+            session=session,
+            cache=HttpCache(path / 'cache' / 'http'),
+            cookies=cookies,
+            _cookies_file=cookies_file,
+            host=host,
+            prefer_saved_cookies=prefer_saved_cookies,
         )
 
     def submit(
@@ -149,21 +256,101 @@ class Client:
 
         return
 
-    def parse_problem(self, url: str) -> CFProblem:
+    def get(self, url: str, timeout: float | None = None, retries: int = 0,
+            backoff: float = 0.5):
+        """ GET url with the headers. On a status in RETRY_STATUS or a network error
+        (timeouts included), retry up to retries times, sleeping a random time up to
+        backoff * 2**attempt before each. Return the last response, or raise the last error.
+        Cacheable pages are served from the cache while fresh, then revalidated with a
+        conditional GET; the cached page is still served if the server can't be reached,
+        except for pages that are always revalidated (max age 0).
+        """
+        cached = self.cache and self.cache.lookup(url)
+        headers = self.headers
+        if cached:
+            entry, text = cached
+            if self.cache.is_fresh(entry):
+                logger.info("GET %s: served from the cache", url)
+                self.cache.touch(url)
+                return CachedResponse(url, text)
+            headers = {**(self.headers or {}), **self.cache.conditional_headers(entry)}
+
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(random.uniform(0, backoff * 2 ** (attempt - 1)))
+            try:
+                resp = self.scraper.get(url, headers=headers, timeout=timeout)
+            except OSError as e:  # requests' exceptions are OSErrors too
+                if attempt < retries:
+                    logger.info("GET %s failed (%s), retrying", url, e)
+                    continue
+                if not (cached and self.cache.usable_stale(entry)):
+                    raise
+                logger.warning("GET %s failed (%s), using the cached page", url, e)
+                return CachedResponse(url, text)
+            if resp.status_code not in RETRY_STATUS:
+                break
+            logger.info("GET %s: %d, retrying", url, resp.status_code)
+
+        if cached and resp.status_code == 304:
+            logger.info("GET %s: not modified, served from the cache", url)
+            self.cache.revalidated(entry)
+            return CachedResponse(url, text)
+        if cached and resp.status_code in RETRY_STATUS and self.cache.usable_stale(entry):
+            logger.warning("GET %s: %d, using the cached page", url, resp.status_code)
+            return CachedResponse(url, text)
+        if self.cache:
+            self.cache.store(url, resp)
+        return resp
+
+    def parse_problem(self, url: str, timeout: float | None = None, retries: int = 0
+                      ) -> CFProblem:
         return CFProblem.parse_from_url(
-            url, web_parser=lambda u: self.scraper.get(u, headers=self.headers).text
+            url, web_parser=lambda u: self.get(u, timeout, retries).text
         )
     
+    def parse_contest_problems(self, url_contest: str, timeout: float | None = None,
+                               retries: int = 0) -> dict[str, CFProblem | None]:
+        """ Parse every problem of a contest from its /problems page, which has all the
+        statements, in one request. Empty if the page has none (like PDF statements), and
+        None for the problems that cannot be parsed from it.
+        """
+        resp = self.get(url_contest + '/problems', timeout, retries)
+        return {
+            idx: page and CFProblem.from_problem_page(f"{url_contest}/problem/{idx}", page)
+            for idx, page in parse_problems_page_from_html(resp.text).items()
+        }
+
     def save(self):
-        if self.headers:
+        """ Save the login (headers, csrf token, handle) and the cookies. Only `pyforces config`
+        saves the login, the other commands only call save_cookies.
+        """
+        if self._login_headers:
             with self._headers_file.open('w') as fp:
-                json.dump(self.headers, fp, indent=4)
-            logger.info("Saved %d headers to %s", len(self.headers), self._headers_file)
+                json.dump(self._login_headers, fp, indent=4)
+            logger.info("Saved %d headers to %s", len(self._login_headers), self._headers_file)
         if self.csrf_token:
             with self._token_file.open('w') as fp:
                 fp.write(self.csrf_token + '\n')
                 fp.write(self.handle)
             logger.info("Saved csrf token and handle")
+        self.save_cookies()
+
+    def save_cookies(self):
+        """ Save the unexpired cookies, so that a Cloudflare challenge is solved once while
+        its cookies are valid, not once per command. Nothing to save if the daemon holds them.
+        """
+        if self.cookie_jar is None or self._cookies_file is None:
+            return
+        cookies = [
+            {'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path,
+             'expires': c.expires, 'secure': c.secure}
+            for c in self.cookie_jar if not c.is_expired()
+        ]
+        self._cookies_file.touch(mode=0o600)  # they log in as the user
+        with self._cookies_file.open('w') as fp:
+            json.dump(cookies, fp, indent=4)
+        logger.info("Saved %d cookies to %s", len(cookies), self._cookies_file)
 
     def parse_csrf_token_and_handle(self, host: str):
         if self.headers is None:
@@ -190,11 +377,12 @@ class Client:
             url_contest: contest url without /countdown
         """
         url_countdown = url_contest + '/countdown'
-        resp = self.scraper.get(url_countdown, headers=self.headers)
+        resp = self.get(url_countdown)  # never cached
         return parse_countdown_from_html(resp.text)
 
-    def parse_problem_indices(self, url_contest: str) -> int:
-        resp = self.scraper.get(url_contest, headers=self.headers)
+    def parse_problem_indices(self, url_contest: str, timeout: float | None = None,
+                              retries: int = 0) -> list[str]:
+        resp = self.get(url_contest, timeout, retries)
         return parse_problem_indices_from_html(resp.text)
     
     def parse_status(self, url_status: str) -> str:
@@ -0,0 +1,103 @@
+from argparse import Namespace
+import re
+import subprocess
+from logging import getLogger
+
+from pyforces.cf.build import CACHE_DIR, build_cached
+from pyforces.cf.supervisor import SupervisedProcess
+from pyforces.config import Config
+
+logger = getLogger(__name__)
+
+# A fixed CPU and memory bound workload: integer arithmetic, random memory access, sorting
+CALIBRATION_SOURCE = r"""
+#include <bits/stdc++.h>
+using namespace std;
+static double now() { return (double)clock() / CLOCKS_PER_SEC; }
+static unsigned long long rng = 88172645463325252ull;
+static unsigned long long next_rand() {
+    rng ^= rng << 13; rng ^= rng >> 7; rng ^= rng << 17;
+    return rng;
+}
+int main() {
+    double t0 = now();
+    unsigned long long sum = 0;
+    for (int i = 0; i < 200000000; i++) sum += next_rand() % 1000003;
+    double t1 = now();
+    const int n = 1 << 22;  // a single random cycle through 16MB
+    vector<unsigned> nxt(n);
+    iota(nxt.begin(), nxt.end(), 0u);
+    for (int i = n - 1; i > 0; i--) swap(nxt[i], nxt[next_rand() % i]);
+    unsigned p = 0;
+    for (int i = 0; i < n; i++) p = nxt[p];
+    double t2 = now();
+    vector<int> a(4000000);
+    for (int &v : a) v = (int)next_rand();
+    sort(a.begin(), a.end());
+    double t3 = now();
+    printf("%llu %u %d\n", sum, p, a[a.size() / 2]);
+    fprintf(stderr, "arithmetic %.3f memory %.3f sort %.3f\n", t1 - t0, t2 - t1, t3 - t2);
+}
+""".lstrip()
+
+# Rough CPU time of the workload on Codeforces judges with -O2, only shown as an estimate.
+# The speed factor is saved only with --judge-time, the time that custom invocation reports
+# for `pyforces calibrate --print-source`.
+JUDGE_REFERENCE_TIME = 1.2
+
+# Compiled the same as on the judge, whatever the default compile profile is (maybe -O0)
+CALIBRATION_FLAGS = ['-O2', '-std=c++17']
+
+RUNS = 3  # the fastest run is used, the others are noise
+
+
+def do_calibrate(cfg: Config, args: Namespace):
+    """ Measure how much slower (>1) or faster (<1) this machine is than the judge, and
+    save it as speed_factor, which scales the time limits of pyforces test and stress.
+    Without --judge-time, only print an estimate.
+    """
+    if args.print_source:
+        print(CALIBRATION_SOURCE, end='')
+        return
+    if args.reset:
+        cfg.speed_factor = 1.0
+        cfg.save()
+        print("Reset the speed factor to 1.0")
+        return
+
+    source = CACHE_DIR / 'calibrate.cpp'
+    source.parent.mkdir(parents=True, exist_ok=True)
+    source.write_text(CALIBRATION_SOURCE)
+    profile = cfg.get_compile_profile()
+    try:
+        executable = build_cached(source, profile.compiler, CALIBRATION_FLAGS, pch=False)
+    except subprocess.CalledProcessError:
+        print("Failed to compile the calibration workload")
+        return
+
+    best = None
+    for i in range(RUNS):
+        usage = SupervisedProcess(
+            str(executable), shell=False, stdin=subprocess.DEVNULL,
+            cpu_limit=60, wall_limit=120,
+        ).wait()
+        if usage.return_code or usage.killed:
+            print(f"Calibration workload failed with exit code {usage.return_code}")
+            return
+        phases = dict(re.findall(r'(\w+) ([\d.]+)', usage.stderr))
+        print(f"Run {i+1}: {usage.cpu_time:.3f}s CPU "
+              f"({', '.join(f'{k} {float(v):.3f}s' for k, v in phases.items())})")
+        if best is None or usage.cpu_time < best:
+            best = usage.cpu_time
+
+    if not args.judge_time:
+        print(f"Local {best:.3f}s, judge about {JUDGE_REFERENCE_TIME:.3f}s, "
+              f"so the speed factor is about {best / JUDGE_REFERENCE_TIME:.2f}")
+        print("Not saved: run the workload (--print-source) in Codeforces custom invocation, "
+              "and pass the time it reports with --judge-time")
+        return
+    cfg.speed_factor = best / args.judge_time
+    cfg.save()
+    print(f"Local {best:.3f}s, judge {args.judge_time:.3f}s")
+    print(f"Saved speed factor {cfg.speed_factor:.2f}: time limits are multiplied by it, "
+          f"and times are also shown divided by it")
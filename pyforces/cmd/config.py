@@ -4,7 +4,7 @@ from pathlib import Path
 import json
 
 from pyforces.client import Client
-from pyforces.config import CodeTemplate, Config
+from pyforces.config import CodeTemplate, CompileProfile, Config
 from pyforces.utils import input_index, input_y_or_n, parse_firefox_http_headers
 
 logger = getLogger(__name__)
@@ -116,6 +116,29 @@ def set_cpp_std(cfg: Config):
     cfg.submit_cpp_std = options[input_index(3)]
     cfg.save()
 
+def config_compile(cfg: Config):
+    for i, profile in enumerate(cfg.compile_profiles):
+        print('*' if profile.name == cfg.default_compile_profile else ' ',
+              f"{i}: {profile.name}\t{profile.compiler} {' '.join(profile.flags)}")
+    if input_y_or_n("Add a new profile? [y/N]\n", default=False):
+        name = input("Name:\n")
+        if not name:
+            print("Name cannot be empty, exiting")
+            return
+        compiler = input("Compiler (input empty line to use g++):\n") or 'g++'
+        flags = input("Flags, separated by spaces (like -O2 -std=c++17):\n").split()
+        pch = input_y_or_n("Precompile bits/stdc++.h? [Y/n]\n", default=True)
+        cfg.compile_profiles = [p for p in cfg.compile_profiles if p.name != name]
+        cfg.compile_profiles.append(CompileProfile(name, compiler, flags, pch))
+    print(f"Current default profile: {cfg.default_compile_profile}")
+    name = input("New default profile (input empty line if u don't want to change it):\n")
+    if name:
+        if cfg.get_compile_profile(name) is None:
+            print(f'Profile "{name}" not found, exiting')
+            return
+        cfg.default_compile_profile = name
+    cfg.save()
+
 def config_parse(cfg: Config):
     print(f"Whether gen after parse?")
     print(f"Current value: {cfg.gen_after_parse}")
@@ -173,6 +196,7 @@ def do_config(cfg: Config, cln: Client):
         ('set host domain', lambda cfg, _: set_host_domain(cfg)),
         ('set root folder name', lambda cfg, _: set_folder_name(cfg)),
         ('set C++ standard for submission', lambda cfg, _: set_cpp_std(cfg)),
+        ('config compile profiles', lambda cfg, _: config_compile(cfg)),
         ('config parse', lambda cfg, _: config_parse(cfg)),
         ('config race', lambda cfg, _: config_race(cfg)),
     ]
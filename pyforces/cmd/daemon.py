@@ -0,0 +1,55 @@
+from argparse import Namespace
+from pathlib import Path
+from logging import getLogger
+
+from pyforces.config import Config
+from pyforces.daemon import SOCKET_FILE, DaemonServer, DaemonSession
+
+logger = getLogger(__name__)
+
+
+def do_daemon(cfg: Config, root: Path, args: Namespace):
+    """ Start, stop or check the daemon that holds one warmed web session for parse, race
+    and submit. It runs in the foreground, put it in a spare terminal or behind `&`.
+    """
+    session = DaemonSession.connect()
+    match args.action:
+        case 'status':
+            if session is None:
+                print("pyforces daemon is not running")
+                return
+            info = session.ping()
+            print(f"pyforces daemon is running: pid {info['pid']}, up {info['uptime']:.0f}s, "
+                  f"{info['requests']} requests served")
+        case 'stop':
+            if session is None:
+                print("pyforces daemon is not running")
+                return
+            session.stop()
+            print("Stopped pyforces daemon")
+        case 'start':
+            if session is not None:
+                print(f"pyforces daemon is already running, pid {session.ping()['pid']}")
+                return
+            SOCKET_FILE.unlink(missing_ok=True)  # left by a daemon that was killed
+
+            from pyforces.client import Client
+            cln = Client.from_path(root, use_daemon=False, host=cfg.host)
+            # Solve the Cloudflare challenge and open the keep-alive connection now,
+            # rather than in the first command
+            print(f"Connecting to {cfg.host}")
+            try:
+                cln.scraper.get(cfg.host, headers=cln.headers, timeout=30)
+            except Exception as e:
+                logger.exception(e)
+                print(f"Failed to connect ({e}), will retry on the first request")
+            cln.save_cookies()
+            with DaemonServer(SOCKET_FILE, cln.scraper) as server:
+                print(f"pyforces daemon is serving on {SOCKET_FILE}, Ctrl-C to stop")
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    cln.save_cookies()
+            print("pyforces daemon stopped")
@@ -5,7 +5,8 @@ from logging import getLogger
 logger = getLogger(__name__)
 
 
-def do_gen(cfg: Config, name: str | None = None):
+def do_gen(cfg: Config, name: str | None = None, path: Path | None = None):
+    """ Generate the solution file from a template in path (default: cwd). """
     if name:
         templates = {t.name: t for t in cfg.templates}
         if name not in templates:
@@ -18,5 +19,6 @@ def do_gen(cfg: Config, name: str | None = None):
         logger.error("No default template, aborting")
         return
     # get the filename like a.cpp
-    f = Path.cwd().parts[-1] + template.path.suffix
+    path = path or Path.cwd()
+    f = path / (path.name + template.path.suffix)
     template.generate(f)
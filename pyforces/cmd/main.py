@@ -2,18 +2,31 @@ from argparse import ArgumentParser, BooleanOptionalAction
 import logging
 import os
 from pathlib import Path
-import colorlog
-from datetime import datetime
-
-from pyforces.client import Client
-from pyforces.cmd.config import do_config
-from pyforces.cmd.gen import do_gen
-from pyforces.cmd.parse import do_parse
-from pyforces.cmd.race import do_race
-from pyforces.cmd.submit import do_submit
-from pyforces.cmd.test import do_test
+import time
+
+from pyforces.cf.compare import CompareMode
 from pyforces.config import Config
 
+# Subcommands (and the web client) are imported when dispatched, so that e.g. pyforces test
+# doesn't pay for lxml, websocket, etc. on every start, see benchmarks/startup.py
+
+
+class ColoredFormatter(logging.Formatter):
+    """ colorlog's formatter, imported on the first record it formats,
+    at the default WARNING level most runs print none.
+    """
+
+    def __init__(self, fmt: str):
+        super().__init__(fmt)
+        self.colored = None
+
+    def format(self, record):
+        if self.colored is None:
+            import colorlog
+            self.colored = colorlog.ColoredFormatter(self._fmt)
+        return self.colored.format(record)
+
+
 def main():
     # Parse command line arguments
     description = """
@@ -55,28 +68,74 @@ Parse current problem's testcases.
     parse_parser.add_argument('--url', type=str, help="""
 (For customization) the problem's URL, for example "https://codeforces.com/contest/2092/problem/A"
     """)
+    parse_parser.add_argument('--all', action='store_true', help="""
+Parse every problem of the contest into the sibling directories (like ../b, ../c), all from
+the contest's problems page in one request.
+    """)
 
     # test
     test_parser = subparsers.add_parser('test', usage="""
 pyforces test [options]
 
 Test the solution against each pair of [input, answer] ([in1.txt, ans1.txt], etc.).
+Testcases are listed in `.pyforces/tests.json`; in<idx>.txt/ans<idx>.txt added or edited by
+hand are picked up automatically. See "pyforces tests" to list and tag them.
 Defaults to use the current directory's name + ".cpp" (like "a.cpp" if in directory "a").
 If you want to use other files or custom command plz use --file or --shell
     """.strip())
     test_parser.add_argument('-f', '--file', type=Path, help="""
 The source file (like a.cpp).
-For .cpp files, will get the executable file's name by source file, and execute it.
+For .cpp files, will compile it with the compile profile (cached by source and flags),
+or with --no-compile, get the executable file's name by source file, and execute it.
 For .py files, will use the current interpreter to run the file.
 For other files, consider --shell
     """)
     test_parser.add_argument('--shell', type=str, help="""
 (For customization) a shell string to run the solution.
 For example, 'java a.java'
+    """)
+    test_parser.add_argument('-t', '--tests', type=str, help="""
+Only run these testcases, like "3,5-9".
+    """)
+    test_parser.add_argument('--tag', type=str, action='append', help="""
+Only run testcases with this tag, can be repeated to select any of them. Inputs from 1MB
+are tagged "big" automatically.
+    """)
+    test_parser.add_argument('--watch', action='store_true', help="""
+Keep running: on every save of the solution, checker, interactor or testcases (noticed
+with inotify, Linux only), rebuild and rerun the tests. Runs of the stale build are killed
+right away, and the tests that failed last time are run and shown first.
+    """)
+    test_parser.add_argument('--force', action='store_true', help="""
+Rerun every testcase. By default, results are cached in `.pyforces/results.json` and
+replayed when the executable (or script and interpreter), the testcase, the limits and the
+compare settings are all unchanged. Timeouts are never cached.
+    """)
+    test_parser.add_argument('--json', type=Path, help="""
+Also write the results to this file as JSON, with every measured field of every run.
+    """)
+    test_parser.add_argument('--junit', type=Path, help="""
+Also write the results to this file as JUnit XML, for CI.
+    """)
+    test_parser.add_argument('--compare-last', action='store_true', help="""
+Flag the tests that got slower or used more memory than in the last run. Every run is
+appended to `.pyforces/history.jsonl`.
+    """)
+    test_parser.add_argument('--regression-threshold', type=float, default=0.1, help="""
+With --compare-last, relative increase of time or memory flagged as a regression.
+Increases under 0.02s or 1MB are ignored as noise. (default: 0.1)
+    """)
+    test_parser.add_argument('--compile', action=BooleanOptionalAction, default=True, help="""
+Whether compile the .cpp solution before running. Builds are cached by the hash of source
+and flags, and bits/stdc++.h is precompiled once per flag set (GCC only).
+    """)
+    test_parser.add_argument('--profile', type=str, help="""
+Name of the compile profile, set them in `pyforces config`. (default: the default profile)
     """)
     test_parser.add_argument('--poll', action=BooleanOptionalAction, default=True, help="""
-Whether use psutil to poll and track memory usage. If false, will use 
-subprocess.run instead.
+Whether track CPU time and peak memory of each run. The program is waited on
+(no busy polling) and killed on double the time limit of CPU time or triple of
+wall time. If false, will use subprocess.run instead.
     """)
     test_parser.add_argument("--time-limit", type=float, default=2.0, help="""
 Time limit in seconds. Can be float. (default: 2.0)
@@ -88,6 +147,169 @@ Memory limit in bytes or K, M, G. (default: 512M)
 "998244353" is 998244353 bytes (about 952M).
 Unit can be both lowercase or uppercase.
     """)
+    test_parser.add_argument('--speed-factor', type=float, help="""
+Local CPU time / judge CPU time, the time limit is multiplied by it. (default: the one
+measured by `pyforces calibrate`, or 1.0)
+    """)
+    test_parser.add_argument('--enforce-memory', action=BooleanOptionalAction, default=True, help="""
+Whether enforce the memory limit in the kernel (Unix only). With cgroup v2 (as root or in
+a delegated cgroup) the program is killed beyond the limit and the exact peak is reported;
+otherwise the address space is limited, so allocations beyond the limit fail. Disable it
+for runtimes that reserve a large address space, like Java.
+    """)
+    test_parser.add_argument('--fork-server', action='store_true', help="""
+Python solutions only (Linux, with --poll). Start one interpreter that imports the
+solution's top-level dependencies, and fork each run from it, so the interpreter startup
+is not paid per test. Peak memory then includes pages shared with that interpreter.
+    """)
+    test_parser.add_argument('--repeat', type=int, default=1, help="""
+Timing mode for borderline solutions: run each testcase this many times, one at a time,
+pinned to one CPU (an isolated one if any), and report min/median/p95 of user, sys and
+wall time. A test is marked at risk if the 95%% confidence interval of its mean CPU time
+crosses the time limit.
+    """)
+    test_parser.add_argument('--timeline', type=float, nargs='?', const=0.01, metavar='INTERVAL', help="""
+Profile each test (Linux only): sample the solution from /proc every INTERVAL seconds
+(default: 0.01) for RSS, user/sys time, page faults, context switches and bytes
+read/written. The samples are written to `.pyforces/timeline/<idx>.csv`, with a summary
+that tells allocation spikes, memory churn and time spent off the CPU apart.
+    """)
+    test_parser.add_argument('-j', '--jobs', type=int, help="""
+Number of testcases to run concurrently. (default: number of physical cores)
+Results are still printed in index order.
+    """)
+    test_parser.add_argument('--compare', choices=[m.value for m in CompareMode], help="""
+How to compare output with answer. (default: from `.pyforces/problem.json`, or lines)
+lines: line by line, ignoring trailing whitespaces;
+tokens: token by token, ignoring all whitespaces;
+float: token by token, numbers within --abs-eps or --rel-eps;
+unordered: lines in any order.
+`pyforces parse` sets float mode if the statement mentions absolute or relative error.
+    """)
+    test_parser.add_argument('--abs-eps', type=float, help="""
+Absolute error allowed in float mode. (default: from `.pyforces/problem.json`, or 1e-6)
+    """)
+    test_parser.add_argument('--rel-eps', type=float, help="""
+Relative error allowed in float mode. (default: from `.pyforces/problem.json`, or 1e-6)
+    """)
+    test_parser.add_argument('--checker', type=str, help="""
+A testlib-style checker for problems with multiple valid answers, run as
+`checker <input> <output> <answer>`. .cpp files are compiled once and cached by content
+hash (put testlib.h next to it), .py files are run by the current interpreter.
+(default: from `.pyforces/problem.json`)
+    """)
+    test_parser.add_argument('--interactor', type=str, help="""
+A testlib-style interactor for interactive problems, run as
+`interactor <input> <output> <answer>` with its stdin and stdout connected to the
+solution's stdout and stdin. Sources are handled like --checker; if --checker is also
+given, it judges the interactor's output file. (default: from `.pyforces/problem.json`)
+    """)
+    test_parser.add_argument('--count-queries', action='store_true', help="""
+Count the lines sent by the solution to the interactor. This forwards the traffic through
+pyforces, which adds a bit of latency to each round trip.
+    """)
+
+    # stress
+    stress_parser = subparsers.add_parser('stress', usage="""
+pyforces stress -g <gen> -b <brute> [options]
+
+Randomized differential testing. Runs "<gen> <seed>" to make an input, then compares the
+solution's output with the brute force's, for seeds 1, 2, 3, ... across all cores.
+Stops at the first disagreement and saves it as the next in<idx>.txt and ans<idx>.txt.
+The solution is chosen like in "pyforces test"; compare mode and checker come from
+`.pyforces/problem.json`.
+    """.strip())
+    stress_parser.add_argument('-g', '--gen', type=Path, required=True, help="""
+The generator (.cpp, .py or executable), called with the seed as its only argument.
+    """)
+    stress_parser.add_argument('-b', '--brute', type=Path, required=True, help="""
+The brute force solution (.cpp, .py or executable) whose output is the answer.
+    """)
+    stress_parser.add_argument('-f', '--file', type=Path, help="""
+The source file of the solution (like a.cpp), see "pyforces test --help".
+    """)
+    stress_parser.add_argument('--shell', type=str, help="""
+(For customization) a shell string to run the solution.
+    """)
+    stress_parser.add_argument('--compile', action=BooleanOptionalAction, default=True, help="""
+Whether compile the .cpp solution before running. Builds are cached by the hash of source
+and flags, and bits/stdc++.h is precompiled once per flag set (GCC only).
+    """)
+    stress_parser.add_argument('--profile', type=str, help="""
+Name of the compile profile, set them in `pyforces config`. (default: the default profile)
+    """)
+    stress_parser.add_argument('-j', '--jobs', type=int, help="""
+Number of workers. (default: number of physical cores)
+    """)
+    stress_parser.add_argument('--seed', type=int, default=1, help="""
+The first seed. (default: 1)
+    """)
+    stress_parser.add_argument('-n', '--count', type=int, help="""
+Number of seeds to try. (default: until a disagreement or Ctrl-C)
+    """)
+    stress_parser.add_argument("--time-limit", type=float, default=2.0, help="""
+Time limit in seconds for the solution. (default: 2.0)
+    """)
+    stress_parser.add_argument("--memory-limit", type=str, default="512M", help="""
+Memory limit in bytes or K, M, G for the solution. (default: 512M)
+    """)
+    stress_parser.add_argument("--helper-time-limit", type=float, default=10.0, help="""
+CPU time limit in seconds for the generator and the brute force, and double of it in wall
+time. One that runs longer is reported as failed. (default: 10.0)
+    """)
+
+    # calibrate
+    calibrate_parser = subparsers.add_parser('calibrate', usage="""
+pyforces calibrate [options]
+
+Run a fixed CPU and memory bound workload (compiled with -O2), and save how much slower
+(>1) or faster (<1) this machine is than the Codeforces judge. Time limits of
+"pyforces test" and "pyforces stress" are then scaled by it, and times are also shown as
+judge-equivalent. Without --judge-time, only a rough estimate is printed.
+    """.strip())
+    calibrate_parser.add_argument('--judge-time', type=float, help="""
+CPU time of the workload on the judge. Print it with --print-source, run it in Codeforces
+custom invocation and pass the time it reports. Required to save the speed factor.
+    """)
+    calibrate_parser.add_argument('--print-source', action='store_true', help="""
+Print the C++ source of the workload and exit.
+    """)
+    calibrate_parser.add_argument('--reset', action='store_true', help="""
+Reset the speed factor to 1.0, so that local times are compared with the limits directly.
+    """)
+
+    # daemon
+    daemon_parser = subparsers.add_parser('daemon', usage="""
+pyforces daemon [start|stop|status]
+
+Keep one warmed web session (Cloudflare cookies, keep-alive connections) in a background
+process listening on ~/.pyforces/daemon.sock. While it's running, parse, race and submit
+send their requests through it, skipping the connection setup of every command.
+"start" runs it in the foreground, use a spare terminal or `&`.
+    """.strip())
+    daemon_parser.add_argument('action', nargs='?', default='start',
+                               choices=['start', 'stop', 'status'])
+
+    # tests
+    tests_parser = subparsers.add_parser('tests', usage="""
+pyforces tests [options]
+
+List the testcases of the current problem with their origin (sample, custom or stress),
+input size, hash and tags, and add or remove tags.
+    """.strip())
+    tests_parser.add_argument('-t', '--tests', type=str, help="""
+Only list these testcases, like "3,5-9".
+    """)
+    tests_parser.add_argument('--tag', type=str, action='append', help="""
+Only list testcases with this tag, can be repeated to select any of them. Inputs from 1MB
+are tagged "big" automatically.
+    """)
+    tests_parser.add_argument('--add-tag', type=str, action='append', help="""
+Add this tag to the listed testcases, can be repeated.
+    """)
+    tests_parser.add_argument('--remove-tag', type=str, action='append', help="""
+Remove this tag from the listed testcases, can be repeated.
+    """)
 
     # submit
     submit_parser = subparsers.add_parser('submit', usage="""
@@ -123,13 +345,13 @@ If set, use this polling interval (in seconds) instead of websocket to receive u
         root_cfg.mkdir()
 
     # Colorful console + file logging
-    handler_console = colorlog.StreamHandler()
-    handler_console.setFormatter(colorlog.ColoredFormatter(
+    handler_console = logging.StreamHandler()
+    handler_console.setFormatter(ColoredFormatter(
         '%(log_color)s[%(levelname)s] %(name)s: %(message)s'))
     handler_console.setLevel(args.log_level.upper())
     logs_dir = root_cfg / 'logs'
     logs_dir.mkdir(exist_ok=True)
-    log_file = logs_dir / datetime.today().strftime('%Y-%m-%d.log')
+    log_file = logs_dir / time.strftime('%Y-%m-%d.log')
     handler_logfile = logging.FileHandler(log_file)
     handler_logfile.setLevel(logging.DEBUG)
     handler_logfile.setFormatter(logging.Formatter(
@@ -140,21 +362,49 @@ If set, use this polling interval (in seconds) instead of websocket to receive u
     logging.debug("Start at %s with args %s", Path.cwd(), args)
 
 
-    # Init config, reload web session (cookies)
+    # Init config, reload web session (cookies) for the subcommands that go online
     cfg = Config.from_file(root_cfg / 'config.json')
-    cln = Client.from_path(root_cfg)
+    if args.subcommand in ('config', 'race', 'parse', 'submit'):
+        from pyforces.client import Client
+        import atexit
+        # config checks the login it saves, which the daemon doesn't have yet
+        cln = Client.from_path(root_cfg, use_daemon=args.subcommand != 'config',
+                               host=cfg.host)
+        atexit.register(cln.save_cookies)  # keep the cookies set by responses, even on Ctrl-C
     
     match args.subcommand:
         case 'config':
+            from pyforces.cmd.config import do_config
             do_config(cfg, cln)
         case 'race':
+            from pyforces.cmd.race import do_race
             do_race(cfg, cln, args)
         case 'gen':
+            from pyforces.cmd.gen import do_gen
             do_gen(cfg, args.name)
         case 'parse':
-            do_parse(cfg, cln, args.url)
+            from pyforces.cmd.parse import do_parse
+            do_parse(cfg, cln, args.url, args.all)
         case 'test':
-            do_test(args)
+            if args.watch:
+                from pyforces.cmd.watch import do_watch
+                do_watch(cfg, args)
+            else:
+                from pyforces.cmd.test import do_test
+                do_test(cfg, args)
+        case 'stress':
+            from pyforces.cmd.stress import do_stress
+            do_stress(cfg, args)
+        case 'tests':
+            from pyforces.cmd.tests import do_tests
+            do_tests(args)
+        case 'calibrate':
+            from pyforces.cmd.calibrate import do_calibrate
+            do_calibrate(cfg, args)
+        case 'daemon':
+            from pyforces.cmd.daemon import do_daemon
+            do_daemon(cfg, root_cfg, args)
         case 'submit':
+            from pyforces.cmd.submit import do_submit
             do_submit(cfg, cln, args)
 
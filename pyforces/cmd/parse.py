@@ -1,29 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logging import getLogger
+from pathlib import Path
+from pyforces.cf.manifest import Manifest, TestOrigin
+from pyforces.cf.parser import parse_float_tolerance
+from pyforces.cf.problem import CFProblem
+from pyforces.cf.problem_type import ProblemType
 from pyforces.cmd.gen import do_gen
-from pyforces.config import Config
+from pyforces.config import Config, ProblemConfig
 from pyforces.client import Client
 from pyforces.utils import get_current_contest_type_id_problem_id
 
 logger = getLogger(__name__)
 
-def do_parse(cfg: Config, cln: Client, url: str | None = None):
+# At contest start the server is slow and sheds load, so problems are fetched a few at a
+# time, each request is bounded, and 403/503/timeouts are retried with jittered backoff
+PARSE_JOBS = 4
+PARSE_TIMEOUT = 15  # seconds per request
+PARSE_RETRIES = 6  # sleeping up to 0.5, 1, 2, 4, 8 and 16 seconds before them
+
+def save_problem(cfg: Config, problem: CFProblem, path: Path) -> list[str]:
+    """ Write the samples (and statement, if parse_problem_md) of a parsed problem under
+    path, and set the compare mode for floating-point answers.
+    Return the messages to show, so that problems saved concurrently don't interleave.
+    """
+    messages = []
+    testcases = problem.testcases
+    manifest = Manifest.from_dir(path)
+    manifest.sync()
+    for idx, (input, answer) in enumerate(testcases):
+        manifest.put(idx+1, input + '\n', answer + '\n', TestOrigin.SAMPLE)
+    manifest.save()
+    messages.append(f"Parsed {len(testcases)} testcases")
+    eps = problem.problem_page.output_spec and \
+        parse_float_tolerance(problem.problem_page.output_spec)
+    if eps:
+        problem_cfg = ProblemConfig.from_dir(path)
+        problem_cfg.compare_mode = 'float'
+        problem_cfg.abs_eps = problem_cfg.rel_eps = eps
+        problem_cfg.save()
+        messages.append(f"Floating-point answers, will compare with error {eps}")
+    if problem.problem_type == ProblemType.INTERACTIVE:
+        messages.append("Interactive problem, the samples are transcripts. "
+                        "Write an interactor and test with  --interactor <file>")
+    if cfg.parse_problem_md:
+        with open(path / "problem.md", "w") as fp:
+            print(problem.problem_page.full_problem_statement(), file=fp)
+        messages.append("Stored problem statement into `problem.md`.")
+    return messages
+
+def parse_problem_into(cfg: Config, cln: Client, url: str, problem_path: Path,
+                       problem: CFProblem | None = None) -> list[str]:
+    """ Save the problem at url (fetched unless given) into problem_path, and generate the
+    template if gen_after_parse (even if parsing failed). Return the messages to show.
+    """
+    try:
+        if problem is None:
+            problem = cln.parse_problem(url, timeout=PARSE_TIMEOUT, retries=PARSE_RETRIES)
+        return save_problem(cfg, problem, problem_path)
+    finally:
+        if cfg.gen_after_parse:
+            do_gen(cfg, path=problem_path)
+
+def parse_contest(cfg: Config, cln: Client, url_contest: str, contest_path: Path
+                  ) -> list[str]:
+    """ Parse every problem of the contest into contest_path/<idx>, like contest_path/a.
+    All statements come from the contest's /problems page in one request; the problems
+    missing from it (or all, if it fails) are fetched one by one, concurrently. Each problem
+    is saved as soon as it's there, and a message printed, in whatever order they arrive.
+    Return the problem indices.
+    """
+    try:
+        problems = cln.parse_contest_problems(url_contest, PARSE_TIMEOUT, PARSE_RETRIES)
+    except Exception as e:
+        logger.exception(e)
+        problems = {}
+    if problems:
+        problem_indices = list(problems)
+    else:
+        print("Cannot parse the problems page, fetching the problems one by one")
+        problem_indices = cln.parse_problem_indices(url_contest, PARSE_TIMEOUT, PARSE_RETRIES)
+    print(f"Found {len(problem_indices)} problems:")
+    print('\n'.join(problem_indices))
+
+    with ThreadPoolExecutor(max_workers=PARSE_JOBS) as pool:
+        futures = {}
+        for idx in problem_indices:
+            problem_path = contest_path / idx.lower()
+            problem_path.mkdir(exist_ok=True)
+            futures[pool.submit(parse_problem_into, cfg, cln, f"{url_contest}/problem/{idx}",
+                                problem_path, problems.get(idx))] = idx
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                messages = future.result()
+            except Exception as e:
+                print(f"Couldn't parse {idx}")
+                logger.exception(e)
+                continue
+            print(f"{idx}: {', '.join(messages)}")
+    return problem_indices
+
+def do_parse(cfg: Config, cln: Client, url: str | None = None,
+             whole_contest: bool = False):
     """ Parse sample testcases under the current directory.
+    If whole_contest, parse every problem of the contest into the sibling directories instead.
     If parse_problem_md is True, will also store `problem.md`. """
+    if whole_contest:
+        contest_type, contest_id, _ = get_current_contest_type_id_problem_id()
+        parse_contest(cfg, cln, f"{cfg.host}/{contest_type}/{contest_id}", Path.cwd().parent)
+        return
     try:
         contest_type, contest_id, problem_id = get_current_contest_type_id_problem_id()
         url = url or f"{cfg.host}/{contest_type}/{contest_id}/problem/{problem_id}"
         problem = cln.parse_problem(url)
-        testcases = problem.testcases
-        for idx, (input, answer) in enumerate(testcases):
-            with open(f"in{idx+1}.txt", "w") as fp:
-                print(input, file=fp)
-            with open(f"ans{idx+1}.txt", "w") as fp:
-                print(answer, file=fp)
-        print(f"Parsed {len(testcases)} testcases")
-        if cfg.parse_problem_md:
-            with open("problem.md", "w") as fp:
-                print(problem.problem_page.full_problem_statement(), file=fp)
-            print("Stored problem statement into `problem.md`.")
+        for message in save_problem(cfg, problem, Path.cwd()):
+            print(message)
     except Exception as e:
         print(f"Couldn't parse {contest_id}/{problem_id}")
         logger.exception(e)
@@ -2,8 +2,7 @@ from argparse import Namespace
 import os
 from pathlib import Path
 from pyforces.client import Client
-from pyforces.cmd.gen import do_gen
-from pyforces.cmd.parse import do_parse
+from pyforces.cmd.parse import parse_contest
 from pyforces.config import Config
 from countdown import countdown as countdown_bar
 import webbrowser
@@ -46,19 +45,9 @@ def do_race(cfg: Config, cln: Client, args: Namespace):
         countdown_bar(mins=0, secs=cfg.race_delay_parse)
 
     print("Parsing examples")
-    problem_indices = cln.parse_problem_indices(url_contest)
-    print(f"Found {len(problem_indices)} problems:")
-    print('\n'.join(problem_indices))
-    for idx in problem_indices:
-        problem_path = contest_path / idx.lower()
-        problem_path.mkdir(exist_ok=True)
-        os.chdir(problem_path)
-        try:
-            print(f"Parsing {idx}")
-            do_parse(cfg, cln)  # it takes accounts of gen_after_parse
-        except Exception as e:
-            logger.exception(e)
+    problem_indices = parse_contest(cfg, cln, url_contest, contest_path)
 
+    for idx in problem_indices:
         if cfg.gen_after_parse and cfg.default_template != -1 and \
                 cfg.race_link_sub_problem and len(idx) == 2 and idx[1] in '23456789':
             try:
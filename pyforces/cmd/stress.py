@@ -0,0 +1,184 @@
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import itertools
+from pathlib import Path
+import subprocess
+import tempfile
+import threading
+import time
+from logging import getLogger
+
+from pyforces.cf.build import program_args
+from pyforces.cf.checker import Checker
+from pyforces.cf.compare import CompareMode
+from pyforces.cf.execute import ExecuteResult, TraditionalExecutor
+from pyforces.cf.manifest import Manifest, TestOrigin
+from pyforces.cf.supervisor import ProcessUsage, SupervisedProcess
+from pyforces.cmd.test import default_jobs, get_solution_kwargs
+from pyforces.config import Config, ProblemConfig
+from pyforces.utils import parse_human_bytesize
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class StressFailure:
+    seed: int
+    input: bytes
+    answer: bytes | None  # None if the brute force failed
+    reason: str
+
+
+def read_all(fp) -> bytes:
+    fp.seek(0)
+    return fp.read()
+
+def run_helper(args: list[str], stdin, time_limit: float) -> ProcessUsage:
+    """ Run the generator or brute force with time_limit of CPU time and double of wall time,
+    so that a hung one doesn't block its worker. stdout and stderr are bytes.
+    """
+    return SupervisedProcess(args, shell=False, stdin=stdin, cpu_limit=time_limit,
+                             wall_limit=time_limit * 2, text=False).wait()
+
+def helper_failure(name: str, usage: ProcessUsage) -> str | None:
+    """ Why the generator or brute force failed, None if it didn't. """
+    if usage.killed:
+        reason = f"{name} killed after {usage.cpu_time:.2f}s of CPU time " \
+            f"and {usage.wall_time:.2f}s of wall time"
+    elif usage.return_code:
+        reason = f"{name} exited with code {usage.return_code}"
+    else:
+        return None
+    stderr = usage.stderr.decode(errors='replace').strip()
+    return f"{reason}: {stderr}" if stderr else reason
+
+def stress_worker(
+    gen: list[str],
+    brute: list[str],
+    executor: TraditionalExecutor,
+    helper_time_limit: float,
+    seeds: itertools.count,
+    seeds_lock: threading.Lock,
+    stop: threading.Event,
+    progress: list[int],
+) -> StressFailure | None:
+    """ Run (gen seed, brute, solution) until a disagreement or stop is set.
+    Each worker reuses its own pair of temp files for input and answer.
+    """
+    with tempfile.NamedTemporaryFile('w+b', suffix='.txt') as fp_in, \
+            tempfile.NamedTemporaryFile('w+b', suffix='.txt') as fp_ans:
+        while not stop.is_set():
+            with seeds_lock:
+                seed = next(seeds)
+
+            usage = run_helper(gen + [str(seed)], subprocess.DEVNULL, helper_time_limit)
+            if reason := helper_failure("Generator", usage):
+                return StressFailure(seed, usage.stdout, None, reason)
+            fp_in.seek(0)
+            fp_in.truncate()
+            fp_in.write(usage.stdout)
+            fp_in.flush()
+
+            fp_in.seek(0)
+            usage = run_helper(brute, fp_in, helper_time_limit)
+            if reason := helper_failure("Brute force", usage):
+                return StressFailure(seed, read_all(fp_in), None, reason)
+            fp_ans.seek(0)
+            fp_ans.truncate()
+            fp_ans.write(usage.stdout)
+            fp_ans.flush()
+
+            fp_in.seek(0)
+            fp_ans.seek(0)
+            with open(fp_in.name) as text_in, open(fp_ans.name) as text_ans:
+                result: ExecuteResult = executor.execute(text_in, text_ans, poll=True)
+            if not result.passed:
+                return StressFailure(seed, read_all(fp_in), read_all(fp_ans),
+                                     result.reason)
+            progress[0] += 1
+
+def do_stress(cfg: Config, args: Namespace):
+    """ Randomized differential testing: run gen <seed> | brute and gen <seed> | solution
+    with increasing seeds across all cores, until they disagree.
+    The failing input is saved as the next in{idx}.txt / ans{idx}.txt.
+    """
+    solution_kwargs = get_solution_kwargs(cfg, args)
+    if solution_kwargs is None:
+        return
+    problem_cfg = ProblemConfig.from_dir(Path.cwd())
+    try:
+        gen = program_args(args.gen)
+        brute = program_args(args.brute)
+        checker = Checker.from_file(Path(problem_cfg.checker)) if problem_cfg.checker else None
+    except subprocess.CalledProcessError:
+        print("Failed to compile the generator, brute force or checker")
+        return
+    executor = TraditionalExecutor(
+        time_limit=args.time_limit,
+        memory_limit=parse_human_bytesize(args.memory_limit),
+        speed_factor=cfg.speed_factor,
+        compare_mode=CompareMode(problem_cfg.compare_mode),
+        abs_eps=problem_cfg.abs_eps,
+        rel_eps=problem_cfg.rel_eps,
+        checker=checker,
+        **solution_kwargs,
+    )
+
+    jobs = args.jobs or default_jobs()
+    seeds = itertools.count(args.seed) if args.count is None else \
+        iter(range(args.seed, args.seed + args.count))
+    seeds_lock = threading.Lock()
+    stop = threading.Event()
+    progresses = [[0] for _ in range(jobs)]
+
+    def worker(progress: list[int]) -> StressFailure | None:
+        try:
+            return stress_worker(gen, brute, executor, args.helper_time_limit, seeds,
+                                 seeds_lock, stop, progress)
+        except StopIteration:  # all seeds taken
+            return
+        finally:
+            stop.set()  # first worker to return stops the others
+
+    print(f"Stress testing with {jobs} jobs, starting from seed {args.seed}")
+    start_time = time.perf_counter()
+    interrupted = False
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(worker, progress) for progress in progresses]
+        try:
+            while not stop.wait(1):
+                done = sum(p[0] for p in progresses)
+                elapsed = time.perf_counter() - start_time
+                print(f"\r{done} passed, {done/elapsed:.0f} tests/s", end='', flush=True)
+        except KeyboardInterrupt:
+            interrupted = True
+            stop.set()
+            SupervisedProcess.kill_all()
+        failures = [f for f in (future.result() for future in futures) if f]
+    done = sum(p[0] for p in progresses)
+    print(f"\r{done} passed in {time.perf_counter() - start_time:.2f}s")
+
+    if interrupted:
+        # The runs in progress were killed (or got the Ctrl-C too), they're not failures
+        print("Interrupted, no disagreement found")
+        return
+
+    if not failures:
+        print("No disagreement found")
+        return
+    failure = min(failures, key=lambda f: f.seed)
+    print(f"Failed on seed {failure.seed}: {failure.reason}")
+    manifest = Manifest.from_dir(Path.cwd())
+    manifest.sync()
+    if failure.answer is not None:
+        testcase = manifest.add(failure.input, failure.answer, TestOrigin.STRESS,
+                                tags=[f"seed={failure.seed}"])
+        manifest.save()
+        print(f"Saved the failing test as {testcase.input} and {testcase.answer}")
+    else:
+        # Without an answer it's not a testcase, keep it out of the manifest
+        idx = manifest.next_index()
+        Path(f"in{idx}.txt").write_bytes(failure.input)
+        print(f"Saved the failing input as in{idx}.txt")
+    exit(1)
@@ -1,38 +1,82 @@
 import os
 from argparse import Namespace
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+import threading
+from typing import Collection, TYPE_CHECKING
 from pathlib import Path
+import subprocess
 import sys
-from pyforces.cf.execute import TraditionalExecutor
+from pyforces.cf.build import build_cached, program_args
+from pyforces.cf.checker import Checker
+from pyforces.cf.compare import CompareMode
+from pyforces.cf.execute import ExecuteResult, InteractiveExecutor, TraditionalExecutor
+from pyforces.cf.manifest import Manifest, parse_index_spec
+from pyforces.cf.report import History, TestRecord, find_regressions, run_summary, \
+    write_json, write_junit
+from pyforces.cf.result_cache import ResultCache, program_fingerprint
+from pyforces.cf.supervisor import SupervisedProcess
+from pyforces.cf.timeline import ProcessTimeline
+from pyforces.config import Config, ProblemConfig
 from pyforces.utils import get_current_cpp_file, parse_human_bytesize
 from logging import getLogger
 
+if TYPE_CHECKING:
+    from pyforces.cf.forkserver import ForkServer
+
 logger = getLogger(__name__)
 
 
-def do_test(args: Namespace):
-    """ Test the source file against test cases.
-    Most users only use cpp and the filename is cwd's name + ".cpp", so this is the default.
+def default_jobs() -> int:
+    """ Number of physical cores, falling back to logical cores. """
+    try:
+        import psutil
+        jobs = psutil.cpu_count(logical=False)
+    except Exception as e:
+        logger.info("Cannot count physical cores: %s", e)
+        jobs = None
+    return jobs or os.cpu_count() or 1
+
+def get_solution_kwargs(cfg: Config, args: Namespace,
+                        cancel: threading.Event | None = None) -> dict | None:
+    """ Get how to run the solution (args or shell) from --file or --shell.
+    C++ sources are compiled into the build cache with the compile profile, unless
+    --no-compile, then the executable next to the source is used. Setting cancel kills
+    the compiler.
+    Print the reason and return None if it cannot be run.
     """
-    time_limit = args.time_limit
-    memory_limit = parse_human_bytesize(args.memory_limit)
     if args.shell:
         if args.file:
             print("Cannot pass both --shell and --file")
             return
-        executor = TraditionalExecutor(
-            shell=args.shell, time_limit=time_limit, memory_limit=memory_limit
-        )
+        return dict(shell=args.shell)
     else:  # Get the execution args from source file
         if args.file:
             source_file = args.file
         else:
             source_file = get_current_cpp_file()
             if not source_file:
-                print("Please test with  -f <file>")
+                print("Please specify the solution with  -f <file>")
                 return
             logger.info('Using source file "%s"', source_file)
 
-        if source_file.suffix == '.cpp':
+        if source_file.suffix == '.cpp' and args.compile:
+            profile = cfg.get_compile_profile(args.profile)
+            if profile is None:
+                print(f'Compile profile "{args.profile}" not found, '
+                      'please add it with `pyforces config`')
+                return
+            logger.info('Compiling "%s" with profile "%s"', source_file, profile.name)
+            try:
+                executable = build_cached(source_file, profile.compiler, profile.flags,
+                                          profile.pch, cancel)
+            except subprocess.CalledProcessError:
+                if not (cancel and cancel.is_set()):
+                    print("Compilation failed")
+                return
+            return dict(args=str(executable))
+
+        elif source_file.suffix == '.cpp':
             if os.name == 'nt':  # Windows, change to .exe
                 executable = source_file.with_suffix('.exe')
             else:  # Unix, remove extension
@@ -47,59 +91,292 @@ def do_test(args: Namespace):
             if mtime_source > mtime_executable:
                 logger.warning('Source file "%s" is modified after executable "%s", '
                                'did you forget to compile?', source_file, executable)
-            executor = TraditionalExecutor(
-                args=str(executable.absolute()),
-                time_limit=time_limit, memory_limit=memory_limit,
-            )
+            return dict(args=str(executable.absolute()))
 
         elif source_file.suffix == '.py':
             # use the current interpreter to run the py file
             logger.info('Using interpreter "%s"', sys.executable)
-            executor = TraditionalExecutor(
-                args=[sys.executable, str(source_file)],
-                time_limit=time_limit, memory_limit=memory_limit,
-            )
+            return dict(args=[sys.executable, str(source_file)])
 
         else:
             print("Other languages are not supported yet >< plz use --shell")
             return
 
+def start_forkserver(args: Namespace) -> 'ForkServer | None':
+    """ Start a fork server for a Python solution, or print why not and return None. """
+    from pyforces.cf.forkserver import ForkServer
+    if not args.file or args.file.suffix != '.py':
+        print("--fork-server only works with a Python solution, ignoring it")
+    elif not args.poll:
+        print("--fork-server only works with --poll, ignoring it")
+    elif not ForkServer.available():
+        print("--fork-server is not supported on this platform, ignoring it")
+    else:
+        logger.info("Starting the fork server")
+        return ForkServer(args.file)
+
+def do_test(cfg: Config, args: Namespace):
+    """ Test the source file against test cases.
+    Most users only use cpp and the filename is cwd's name + ".cpp", so this is the default.
+    """
+    outcome = run_tests(cfg, args)
+    if outcome and outcome[0]:
+        exit(outcome[0])
+
+def run_tests(
+    cfg: Config,
+    args: Namespace,
+    cancel: threading.Event | None = None,
+    first: Collection[int] = (),
+) -> tuple[int, list[int]] | None:
+    """ Build the solution and run the selected testcases, printing the results.
+    Testcases in first (like the ones that failed last time) are run and printed first.
+    Once cancel is set, the compiler is killed, the remaining testcases are skipped and
+    nothing more is printed; the caller kills the in-flight runs with kill_all.
+    Return (exit code, indices of failed testcases), None if it cannot be run.
+    """
+    try:
+        indices = parse_index_spec(args.tests) if args.tests else None
+    except ValueError as e:
+        print(e)
+        return 2, []
+    time_limit = args.time_limit
+    memory_limit = parse_human_bytesize(args.memory_limit)
+    speed_factor = args.speed_factor or cfg.speed_factor
+    problem_cfg = ProblemConfig.from_dir(Path.cwd())
+    solution_kwargs = get_solution_kwargs(cfg, args, cancel)
+    if solution_kwargs is None:
+        return
+
+    checker = None
+    checker_file = args.checker or problem_cfg.checker
+    interactor_file = args.interactor or problem_cfg.interactor
+    try:
+        if checker_file:
+            logger.info('Using checker "%s"', checker_file)
+            checker = Checker.from_file(Path(checker_file), cancel)
+        if interactor_file:
+            logger.info('Using interactor "%s"', interactor_file)
+            interactor = program_args(Path(interactor_file), cancel)
+    except subprocess.CalledProcessError:
+        if not (cancel and cancel.is_set()):
+            print("Failed to compile the checker or interactor")
+        return
+
+    forkserver = None
+    # Everything but the solution and testcase that affects the result
+    settings = dict(
+        time_limit=time_limit, memory_limit=memory_limit, poll=args.poll,
+        speed_factor=speed_factor, checker=checker and program_fingerprint(checker.args),
+    )
+    if interactor_file:
+        if args.fork_server:
+            print("--fork-server doesn't work with interactive problems, ignoring it")
+        settings.update(interactor=program_fingerprint(interactor),
+                        count_queries=args.count_queries)
+        executor = InteractiveExecutor(
+            interactor=interactor,
+            time_limit=time_limit, memory_limit=memory_limit, speed_factor=speed_factor,
+            checker=checker, count_queries=args.count_queries, cancel=cancel,
+            **solution_kwargs,
+        )
+    else:
+        compare_kwargs = dict(
+            compare_mode=CompareMode(args.compare or problem_cfg.compare_mode),
+            abs_eps=args.abs_eps if args.abs_eps is not None else problem_cfg.abs_eps,
+            rel_eps=args.rel_eps if args.rel_eps is not None else problem_cfg.rel_eps,
+        )
+        logger.info("Comparing with %s", compare_kwargs)
+        settings.update(compare_kwargs, compare_mode=compare_kwargs['compare_mode'].value,
+                        enforce_memory=args.enforce_memory)
+        executor = TraditionalExecutor(
+            time_limit=time_limit, memory_limit=memory_limit, speed_factor=speed_factor,
+            checker=checker, enforce_memory=args.enforce_memory, cancel=cancel,
+            **compare_kwargs, **solution_kwargs,
+        )
+        if args.fork_server:
+            forkserver = executor.forkserver = start_forkserver(args)
+
+    manifest = Manifest.from_dir(Path.cwd())
+    if manifest.sync():
+        manifest.save()
+    testcases = manifest.select(indices, args.tag)
+
+    if not testcases:
+        if manifest.testcases:
+            print("No testcases selected")
+        else:
+            print("No testcases found, please parse them first")
+        return 1, []
+    first = set(first)
+    testcases.sort(key=lambda t: t.idx not in first)  # stable, so in index order otherwise
+
+    jobs = args.jobs or default_jobs()
+    poll = args.poll
+    if args.repeat > 1:
+        from pyforces.cf.timing import TimingStats, pick_timing_cpu
+        # Runs would disturb each other's timing, so one at a time on one CPU
+        jobs = 1
+        if not poll:
+            print("--repeat needs user and sys time, ignoring --no-poll")
+            poll = True
+        if isinstance(executor, TraditionalExecutor):
+            executor.cpu = pick_timing_cpu()
+            logger.info("Pinning the solution to CPU %s", executor.cpu)
+    timeline_interval = args.timeline
+    if timeline_interval:
+        if not ProcessTimeline.available():
+            print("--timeline reads /proc, only on Linux, ignoring it")
+            timeline_interval = None
+        elif not poll:
+            print("--timeline needs to supervise the program, ignoring --no-poll")
+            poll = True
+    logger.info("Running %d testcases with %d jobs", len(testcases), jobs)
+
+    # Replay results of unchanged (solution, testcase, settings), except in timing mode
+    result_cache = None
+    if args.repeat == 1 and not timeline_interval and 'args' in solution_kwargs:
+        result_cache = ResultCache.from_dir(Path.cwd())
+        solution = program_fingerprint(solution_kwargs['args'])
+    cache_keys = {
+        t.idx: ResultCache.key(solution, t.input_hash, t.answer_hash, settings)
+        for t in testcases
+    } if result_cache else {}
+
+    timelines = {}  # idx -> timeline of the last run
+
+    def run_testcase(idx: int, in_file: Path, ans_file: Path) -> list[ExecuteResult]:
+        """ Run it args.repeat times, stopping at the first failure other than TLE. """
+        results = []
+        for _ in range(args.repeat):
+            if cancel and cancel.is_set():
+                break
+            timeline = None
+            if timeline_interval:
+                timeline = timelines[idx] = ProcessTimeline(timeline_interval)
+            with in_file.open() as fp_in, ans_file.open() as fp_ans:
+                results.append(executor.execute(fp_in, fp_ans, poll, timeline))
+            if not results[-1].passed and not results[-1].timeout:
+                break
+        return results
+
+    def format_time(t: float, digits: int = 2) -> str:
+        """ Raw time, and the judge-equivalent if calibrated. """
+        if speed_factor == 1:
+            return f"{t:.{digits}f}s"
+        return f"{t:.{digits}f}s (judge ~{t/speed_factor:.{digits}f}s)"
+
+    if speed_factor != 1:
+        print(f"Speed factor {speed_factor:.2f}, time limit {time_limit:.2f}s on the judge "
+              f"is {time_limit*speed_factor:.2f}s here")
     return_code = 0  # exit code to indicate whether passed
-    idx = 1
-    while True:
-        in_file = Path(f"in{idx}.txt")
-        ans_file = Path(f"ans{idx}.txt")
-        if not in_file.is_file() or not ans_file.is_file():
-            break
-        with in_file.open() as fp_in, ans_file.open() as fp_ans:
-            result = executor.execute(fp_in, fp_ans, args.poll)
-        if result.passed:
-            print(f"#{idx} Passed...  {result.execution_time:.2f}s",
-                  f"{result.peak_memory/1024/1024:.2f}MB" if result.peak_memory and
-                  result.peak_memory>0 else "")
-            if result.memory_exceeded:
-                # MLE, but don't change return_code
-                print(f"...But memory exceeded")
+    failed = []
+    records = []
+    with forkserver or nullcontext(), ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        cached = set()
+        for t in testcases:
+            result = None
+            if result_cache and not args.force:
+                result = result_cache.get(cache_keys[t.idx])
+            if result is None:
+                futures.append(pool.submit(run_testcase, t.idx, Path(t.input), Path(t.answer)))
+            else:
+                cached.add(t.idx)
+                futures.append(Future())
+                futures[-1].set_result([result])
+        # Print in order; each result is printed as soon as it and all before it finish
+        inputs = {t.idx: t.input for t in testcases}
+        for idx, future in zip(inputs, futures):
+            try:
+                results = future.result()
+            except KeyboardInterrupt:
+                # The runs are in their own sessions, out of reach of the Ctrl-C
+                pool.shutdown(wait=False, cancel_futures=True)
+                SupervisedProcess.kill_all()
+                raise
+            if cancel and cancel.is_set():
+                return  # stale, don't cache or print
+            result = results[-1]
+            if result_cache and idx not in cached:
+                result_cache.put(cache_keys[idx], result)
+            timed = [r for r in results if r.user_time is not None]
+            if args.repeat > 1 and len(timed) == args.repeat:
+                # Only TLE failures, if any: judge by the mean over all runs
+                stats = TimingStats.from_results(timed, executor.time_limit)
+                tle_runs = sum(not r.passed for r in results)
+                passed = stats.cpu_mean <= executor.time_limit
+                at_risk = stats.at_risk or passed and tle_runs > 0
+                print(f"#{idx} {'Passed' if passed else 'Failed'}...  "
+                      f"{format_time(stats.cpu_mean, 3)} mean of {stats.runs} runs",
+                      f"({tle_runs} exceeded the time limit)" if tle_runs else "",
+                      "(AT RISK)" if at_risk else "")
+                print(stats.report())
+                if stats.at_risk:
+                    print(f"...The confidence interval crosses the time limit "
+                          f"{executor.time_limit:.2f}s")
+                if not passed:
+                    return_code = 1
+                    failed.append(idx)
+            elif result.passed:
+                print(f"#{idx} Passed...  {format_time(result.execution_time)}",
+                      f"{result.peak_memory/1024/1024:.2f}MB" if result.peak_memory and
+                      result.peak_memory>0 else "",
+                      f"(interactor {result.interactor_time:.2f}s)"
+                      if result.interactor_time is not None else "",
+                      f"{result.queries} queries" if result.queries is not None else "",
+                      "(cached)" if idx in cached else "")
+                if result.memory_exceeded:
+                    # MLE, but don't change return_code
+                    print(f"...But memory exceeded")
+            else:
+                print(f"#{idx} Failed...  {result.reason}",
+                      f"(on run {len(results)})" if args.repeat > 1 else "",
+                      "(cached)" if idx in cached else "")
+                return_code = result.return_code or 1  # exit the status code if RE, else 1
+                failed.append(idx)
+            records.append(TestRecord(idx, inputs[idx], idx not in failed, idx in cached,
+                                      results))
+            if idx in timelines:
+                timeline_file = Path('.pyforces') / 'timeline' / f'{idx}.csv'
+                timelines[idx].write_csv(timeline_file)
+                for line in timelines[idx].summary():
+                    print(f"...{line}")
+                print(f"...Timeline written to {timeline_file}")
+
+    if result_cache:
+        result_cache.save()
+        if cached:
+            print(f"{len(cached)} unchanged testcase(s) replayed from cache, "
+                  "use --force to rerun them")
+
+    if not poll:
+        # Per test from wait4 (or the cgroup); RUSAGE_CHILDREN would count the compiler and
+        # checkers too
+        peaks = [record.peak_memory for record in records if record.peak_memory]
+        if peaks:
+            print(f"Peak memory usage: {max(peaks)/1024/1024:.2f}MB")
+
+    history = History.from_dir(Path.cwd())
+    summary = run_summary(records, dict(
+        solution=solution_kwargs.get('args') and program_fingerprint(solution_kwargs['args']),
+        file=str(args.file) if args.file else None, shell=args.shell, settings=settings,
+    ))
+    if args.compare_last:
+        last = history.last()
+        if last is None:
+            print("No previous run to compare with")
         else:
-            print(f"#{idx} Failed...  {result.reason}")
-            return_code = result.return_code or 1  # exit the status code if RE, else 1
-        idx += 1
-
-    if idx == 1:
-        print("No testcases found, please parse them first")
-        return_code = 1
-    
-    if not args.poll and os.name == 'posix':
-        try:
-            import resource
-            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
-            peak_memory = usage.ru_maxrss
-            if sys.platform == 'linux':
-                peak_memory *= 1024  # on Linux it's KB
-            print(f"Peak memory usage <= {peak_memory/1024/1024:.2f}MB")
-        except Exception as e:
-            logger.exception(e)
-
-    if return_code:
-        exit(return_code)
+            regressions = find_regressions(last, records, args.regression_threshold)
+            print(f"Compared with the run at {last['time']}:",
+                  f"{len(regressions)} regression(s)" if regressions else "no regressions")
+            for line in regressions:
+                print(f"...{line}")
+    history.append(summary)
+    if args.json:
+        write_json(args.json, summary)
+    if args.junit:
+        write_junit(args.junit, records, Path.cwd().name)
+
+    return return_code, failed
 
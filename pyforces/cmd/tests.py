@@ -0,0 +1,39 @@
+from argparse import Namespace
+from pathlib import Path
+from logging import getLogger
+
+from pyforces.cf.manifest import Manifest, parse_index_spec
+from pyforces.utils import to_human_bytesize
+
+logger = getLogger(__name__)
+
+
+def do_tests(args: Namespace):
+    """ List the testcases of the current problem, and tag or untag them. """
+    try:
+        indices = parse_index_spec(args.tests) if args.tests else None
+    except ValueError as e:
+        print(e)
+        exit(2)
+    manifest = Manifest.from_dir(Path.cwd())
+    changed = manifest.sync()
+    testcases = manifest.select(indices, args.tag)
+
+    for testcase in testcases:
+        for tag in args.add_tag or []:
+            if tag not in testcase.tags:
+                testcase.tags.append(tag)
+                changed = True
+        for tag in args.remove_tag or []:
+            if tag in testcase.tags:
+                testcase.tags.remove(tag)
+                changed = True
+    if changed:
+        manifest.save()
+
+    if not testcases:
+        print("No testcases found")
+        return
+    for t in testcases:
+        print(f"#{t.idx}  {t.origin:6}  {to_human_bytesize(t.input_size):>10}  "
+              f"{t.input_hash[:8]}  {' '.join(t.tags)}")
@@ -0,0 +1,86 @@
+from argparse import Namespace
+from datetime import datetime
+import os
+from pathlib import Path
+import threading
+from logging import getLogger
+
+from pyforces.cf.inotify import Inotify
+from pyforces.cf.manifest import TESTCASE_PATTERN
+from pyforces.cf.supervisor import SupervisedProcess
+from pyforces.cmd.test import run_tests
+from pyforces.config import Config, ProblemConfig
+from pyforces.utils import get_current_cpp_file
+
+logger = getLogger(__name__)
+
+DEBOUNCE = 0.05  # seconds to wait for the rest of one save (write, rename, etc.)
+
+
+def is_testcase_file(path: Path) -> bool:
+    return bool(TESTCASE_PATTERN.fullmatch(path.name)) or \
+        path.name.startswith('ans') and path.suffix == '.txt'
+
+def do_watch(cfg: Config, args: Namespace):
+    """ Rerun the tests on every change of the solution, checker, interactor or testcases.
+    Changes are waited for with inotify. A change cancels the current run right away, by
+    killing its compiler and programs, and the tests that failed last time are run and
+    printed first. Ctrl-C kills the current run and quits.
+    """
+    if not Inotify.available():
+        print("--watch needs inotify, only on Linux")
+        return
+    if not args.poll:
+        print("--watch needs --poll to cancel runs, ignoring --no-poll")
+        args.poll = True
+    if not args.file and not args.shell:
+        args.file = get_current_cpp_file()  # fixed, so that it's watched
+    problem_cfg = ProblemConfig.from_dir(Path.cwd())
+    solution = args.file
+    if solution and solution.suffix == '.cpp' and not args.compile:
+        solution = solution.with_suffix('.exe' if os.name == 'nt' else '')  # compiled by hand
+    watched = {
+        Path(f).absolute() for f in
+        (solution, args.checker or problem_cfg.checker,
+         args.interactor or problem_cfg.interactor) if f
+    }
+
+    failing = []
+
+    def run(cancel: threading.Event):
+        print(f"--- {datetime.now().strftime('%H:%M:%S')} ---")
+        outcome = run_tests(cfg, args, cancel=cancel, first=failing)
+        if cancel.is_set():
+            return
+        if outcome:
+            failing[:] = outcome[1]
+        print("Watching for changes, Ctrl-C to quit")
+
+    with Inotify() as inotify:
+        for directory in {Path.cwd()} | {f.parent for f in watched}:
+            inotify.add_watch(directory)
+        try:
+            while True:
+                cancel = threading.Event()
+                runner = threading.Thread(target=run, args=(cancel,), daemon=True)
+                runner.start()
+                try:
+                    changed = []
+                    while not changed:
+                        changed = [p for p in inotify.read()
+                                   if p in watched or p.parent == Path.cwd() and
+                                   is_testcase_file(p)]
+                    changed += inotify.read(DEBOUNCE)
+                finally:
+                    cancel.set()
+                    SupervisedProcess.kill_all()
+                runner.join()
+                logger.info("Changed: %s", changed)
+                print(f"\n{changed[0].name} changed, rerunning")
+        except KeyboardInterrupt:
+            # Ctrl-C lands in this thread, wherever it's waiting; the run is cancelled either
+            # way, so that no compiler or program outlives pyforces
+            cancel.set()
+            SupervisedProcess.kill_all()
+            runner.join()
+            print("\nStopped watching")
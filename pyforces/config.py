@@ -4,7 +4,6 @@ import os
 import shutil
 from pathlib import Path
 from typing import Literal, Optional
-import pickle
 from logging import getLogger
 
 logger = getLogger(__name__)
@@ -27,6 +26,29 @@ class CodeTemplate:
         shutil.copy(self.path, dest)
 
 
+class CompileProfile:
+    """ How to compile C++ solutions, selected with `pyforces test --profile`. """
+
+    def __init__(self,
+                 name: str,
+                 compiler: str,
+                 flags: list[str],
+                 pch: bool = True,
+                 ):
+        self.name = name
+        self.compiler = compiler
+        self.flags = flags
+        self.pch = pch  # whether use a precompiled bits/stdc++.h
+
+
+DEFAULT_COMPILE_PROFILES = [
+    CompileProfile(name='default', compiler='g++', flags=['-O2', '-std=c++17']),
+    CompileProfile(name='debug', compiler='g++', flags=[
+        '-g', '-O0', '-std=c++17', '-D_GLIBCXX_DEBUG', '-fsanitize=undefined',
+    ]),
+]
+
+
 @dataclass
 class Config:
     """
@@ -43,6 +65,9 @@ class Config:
         race_open_url: url suffix to open in browser, default '/problems'
         race_delay_parse: seconds to delay parse after the race start (to avoid network congestion)
         race_link_sub_problem: whether use hard link to bind multiple problem files into one
+        compile_profiles: how to compile C++ solutions before testing
+        default_compile_profile: name of the profile used without --profile
+        speed_factor: local CPU time / judge CPU time, set by `pyforces calibrate`
     """
     
     templates: list[CodeTemplate]
@@ -55,6 +80,9 @@ class Config:
     race_open_url: str
     race_delay_parse: int
     race_link_sub_problem: bool
+    compile_profiles: list[CompileProfile]
+    default_compile_profile: str
+    speed_factor: float
     _config_file: Path
 
     @classmethod
@@ -81,9 +109,18 @@ class Config:
             race_open_url=cfg.get('race_open_url', '/problems'),
             race_delay_parse=cfg.get('race_delay_parse', 3),
             race_link_sub_problem=cfg.get('race_link_sub_problem', True),
+            compile_profiles=[CompileProfile(**kwargs) for kwargs in cfg['compile_profiles']]
+                if 'compile_profiles' in cfg else DEFAULT_COMPILE_PROFILES.copy(),
+            default_compile_profile=cfg.get('default_compile_profile', 'default'),
+            speed_factor=cfg.get('speed_factor', 1.0),
             _config_file=path,
         )
 
+    def get_compile_profile(self, name: str | None = None) -> CompileProfile | None:
+        """ The profile with the name (default if None), None if not found. """
+        name = name or self.default_compile_profile
+        return next((p for p in self.compile_profiles if p.name == name), None)
+
     def save(self):
         """ Save to json file (at ~/.pyforces/config.json). """
         cfg = {
@@ -97,6 +134,69 @@ class Config:
             'race_open_url': self.race_open_url,
             'race_delay_parse': self.race_delay_parse,
             'race_link_sub_problem': self.race_link_sub_problem,
+            'compile_profiles': [
+                {'name': p.name, 'compiler': p.compiler, 'flags': p.flags, 'pch': p.pch}
+                for p in self.compile_profiles
+            ],
+            'default_compile_profile': self.default_compile_profile,
+            'speed_factor': self.speed_factor,
+        }
+        with self._config_file.open('w') as fp:
+            json.dump(cfg, fp, indent=4)
+
+
+@dataclass
+class ProblemConfig:
+    """
+    Per-problem config, stored in `.pyforces/problem.json` under the problem directory.
+    Use `ProblemConfig.from_dir` to init a new one. Command line arguments take precedence.
+
+    Vars:
+        compare_mode: how to compare output with answer, one of lines, tokens, float, unordered
+        abs_eps: absolute error allowed in float mode
+        rel_eps: relative error allowed in float mode
+        checker: path to a testlib-style checker (source or executable), None if not used
+        interactor: path to a testlib-style interactor (source or executable), None if not used
+    """
+
+    compare_mode: str
+    abs_eps: float
+    rel_eps: float
+    checker: Optional[str]
+    interactor: Optional[str]
+    _config_file: Path
+
+    @classmethod
+    def from_dir(cls, path: Path):
+        """ Init a new problem config object from the problem directory. """
+        config_file = path / '.pyforces' / 'problem.json'
+        try:
+            with config_file.open() as fp:
+                cfg = json.load(fp)
+        except FileNotFoundError:
+            cfg = {}
+        except json.JSONDecodeError:
+            logger.error("Problem config %s decode error, ignoring it", config_file)
+            cfg = {}
+
+        return cls(
+            compare_mode=cfg.get('compare_mode', 'lines'),
+            abs_eps=cfg.get('abs_eps', 1e-6),
+            rel_eps=cfg.get('rel_eps', 1e-6),
+            checker=cfg.get('checker'),
+            interactor=cfg.get('interactor'),
+            _config_file=config_file,
+        )
+
+    def save(self):
+        """ Save to json file (at .pyforces/problem.json). """
+        cfg = {
+            'compare_mode': self.compare_mode,
+            'abs_eps': self.abs_eps,
+            'rel_eps': self.rel_eps,
+            'checker': self.checker,
+            'interactor': self.interactor,
         }
+        self._config_file.parent.mkdir(exist_ok=True)
         with self._config_file.open('w') as fp:
             json.dump(cfg, fp, indent=4)
@@ -0,0 +1,207 @@
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from pathlib import Path
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+SOCKET_FILE = Path.home() / '.pyforces' / 'daemon.sock'
+
+MESSAGE_HEADER = struct.Struct('>I')  # length of the JSON message that follows
+
+# Keyword arguments of requests' get/post that are passed through
+REQUEST_KWARGS = ('headers', 'params', 'data', 'timeout', 'allow_redirects')
+
+
+def send_message(conn: socket.socket, message: dict):
+    data = json.dumps(message).encode()
+    conn.sendall(MESSAGE_HEADER.pack(len(data)) + data)
+
+def recv_message(conn: socket.socket) -> dict | None:
+    """ The next message, None if the peer closed the connection. """
+    header = _recv_exactly(conn, MESSAGE_HEADER.size)
+    if header is None:
+        return None
+    data = _recv_exactly(conn, MESSAGE_HEADER.unpack(header)[0])
+    if data is None:
+        raise ConnectionError("Connection closed in the middle of a message")
+    return json.loads(data)
+
+def _recv_exactly(conn: socket.socket, size: int) -> bytes | None:
+    chunks = []
+    while size:
+        chunk = conn.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+class DaemonResponse:
+    """ The parts of a requests.Response that the client uses. """
+
+    def __init__(self, status_code: int, url: str, headers: dict[str, str], text: str):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.text = text
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def __repr__(self):
+        return f"<Response [{self.status_code}]>"
+
+
+class DaemonSession:
+    """ Send HTTP requests through a running pyforces daemon, which holds a warmed
+    cloudscraper session, instead of paying its import, TLS handshake and Cloudflare
+    challenge in every command. Same get/post as a requests session.
+    Each thread has its own connection to the daemon, which serves them concurrently.
+    """
+
+    def __init__(self, socket_file: Path):
+        self.socket_file = socket_file
+        self._local = threading.local()
+
+    @classmethod
+    def connect(cls, socket_file: Path = SOCKET_FILE):
+        """ A session if the daemon is running, else None. """
+        session = cls(socket_file)
+        try:
+            session.ping()
+        except (OSError, ValueError) as e:
+            logger.info("pyforces daemon is not running: %s", e)
+            return None
+        return session
+
+    def _conn(self) -> socket.socket:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                conn.connect(str(self.socket_file))
+            except OSError:
+                conn.close()
+                raise
+            self._local.conn = conn
+        return conn
+
+    def call(self, message: dict) -> dict:
+        conn = self._conn()
+        try:
+            send_message(conn, message)
+            reply = recv_message(conn)
+        except OSError:
+            self.close()
+            raise
+        if reply is None:
+            self.close()
+            raise ConnectionError("pyforces daemon closed the connection")
+        if 'error' in reply:
+            raise ConnectionError(f"pyforces daemon: {reply['error']}")
+        return reply
+
+    def ping(self) -> dict:
+        """ pid, uptime and number of requests served by the daemon. """
+        return self.call({'op': 'ping'})
+
+    def stop(self):
+        self.call({'op': 'stop'})
+
+    def request(self, method: str, url: str, **kwargs) -> DaemonResponse:
+        unsupported = kwargs.keys() - set(REQUEST_KWARGS)
+        assert not unsupported, f"Cannot pass {unsupported} through the daemon"
+        reply = self.call({'op': 'request', 'method': method, 'url': url, **kwargs})
+        return DaemonResponse(**reply)
+
+    def get(self, url: str, **kwargs) -> DaemonResponse:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> DaemonResponse:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class DaemonHandler(socketserver.BaseRequestHandler):
+    """ Serve the messages of one connection until it's closed. """
+
+    def handle(self):
+        server: DaemonServer = self.server
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (OSError, ValueError) as e:
+                logger.warning("Dropping a connection: %s", e)
+                return
+            if message is None:
+                return
+            try:
+                reply = server.serve(message)
+            except Exception as e:
+                logger.exception(e)
+                reply = {'error': f"{type(e).__name__}: {e}"}
+            try:
+                send_message(self.request, reply)
+            except OSError as e:
+                logger.warning("Cannot reply: %s", e)
+                return
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ Hold one scraper session (cookies, keep-alive connection pool) and make the
+    HTTP requests of pyforces commands with it.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_file: Path, scraper):
+        self.scraper = scraper
+        self.started = time.time()
+        self.requests = 0
+        socket_file.parent.mkdir(exist_ok=True)
+        # The daemon sends requests with the user's cookies, only the user may connect
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_file), DaemonHandler)
+        finally:
+            os.umask(umask)
+        self.socket_file = socket_file
+
+    def serve(self, message: dict) -> dict:
+        match message.get('op'):
+            case 'ping':
+                return {'pid': os.getpid(), 'uptime': time.time() - self.started,
+                        'requests': self.requests}
+            case 'stop':
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return {}
+            case 'request':
+                kwargs = {k: message[k] for k in REQUEST_KWARGS if k in message}
+                start = time.perf_counter()
+                resp = self.scraper.request(message['method'], message['url'], **kwargs)
+                self.requests += 1
+                logger.info("%s %s: %d in %.3fs", message['method'], message['url'],
+                            resp.status_code, time.perf_counter() - start)
+                return {'status_code': resp.status_code, 'url': resp.url,
+                        'headers': dict(resp.headers), 'text': resp.text}
+            case op:
+                return {'error': f"Unknown op {op}"}
+
+    def server_close(self):
+        super().server_close()
+        try:
+            self.socket_file.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,170 @@
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+MAX_CACHE_BYTES = 64 << 20  # least recently used pages are evicted beyond this
+
+# URL pattern -> seconds a cached page is used without asking the server, the first match
+# wins. After that it's revalidated with a conditional GET, and still used if the server is
+# unreachable, unless the age is 0. Pages that match no rule, or a rule with None, are never
+# cached.
+CACHE_RULES = [
+    # Dynamic: the countdown, verdicts, submissions, standings
+    (re.compile(r'/(countdown|status|my|submit|submission|standings)\b'), None),
+    # Statements rarely change, but may be fixed during a contest
+    (re.compile(r'/((contest|gym)/\d+/(problem/\w+|problems)|problemset/problem/\d+/\w+)/?$'),
+     600),
+    # The problem list of a contest, changes when it starts
+    (re.compile(r'/(contest|gym)/\d+/?$'), 0),
+]
+
+
+def max_age(url: str) -> int | None:
+    """ Seconds the page at url is fresh for, None if it's not cached. """
+    path = url.split('?', 1)[0]
+    for pattern, age in CACHE_RULES:
+        if pattern.search(path):
+            return age
+    return None
+
+def header(headers, name: str) -> str | None:
+    """ Case-insensitive lookup, headers may be a plain dict. """
+    name = name.lower()
+    return next((v for k, v in headers.items() if k.lower() == name), None)
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    fetched: float  # time.time() of the last download or revalidation
+    etag: str | None
+    last_modified: str | None
+
+
+class CachedResponse:
+    """ A page served from the cache, with the parts of a requests.Response that the
+    client uses.
+    """
+    status_code = 200
+    ok = True
+    from_cache = True
+
+    def __init__(self, url: str, text: str):
+        self.url = url
+        self.headers = {}
+        self.text = text
+
+    def __repr__(self):
+        return "<Response [200] (cached)>"
+
+
+class HttpCache:
+    """ Responses of cacheable pages (see CACHE_RULES), stored under the cache dir as
+    <hash>.html with the body and <hash>.json with the validators and fetch time.
+    The files' mtime is the last use, for LRU eviction.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # race parses problems in threads
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.html"
+
+    def lookup(self, url: str) -> tuple[CacheEntry, str] | None:
+        """ The entry and body cached for url, None if none. """
+        if max_age(url) is None:
+            return None
+        meta_file, body_file = self._paths(url)
+        try:
+            with meta_file.open() as fp:
+                entry = CacheEntry(**json.load(fp))
+            text = body_file.read_text()
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning("Broken cache entry for %s: %s", url, e)
+            return None
+        return entry, text
+
+    @staticmethod
+    def is_fresh(entry: CacheEntry) -> bool:
+        age = max_age(entry.url)
+        return age is not None and time.time() - entry.fetched < age
+
+    @staticmethod
+    def usable_stale(entry: CacheEntry) -> bool:
+        """ Whether the page may be served when it can't be revalidated. """
+        return bool(max_age(entry.url))
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> dict[str, str]:
+        """ Headers asking the server to answer 304 if the page hasn't changed. """
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url: str, resp):
+        """ Cache a 200 response if the url is cacheable. Redirected responses aren't, like a
+        problem of a contest that hasn't started, which redirects to the contest page.
+        """
+        if max_age(url) is None or resp.status_code != 200:
+            return
+        if getattr(resp, 'history', None) or resp.url != url:
+            logger.info("Not caching %s, redirected to %s", url, resp.url)
+            return
+        entry = CacheEntry(url=url, fetched=time.time(), etag=header(resp.headers, 'ETag'),
+                           last_modified=header(resp.headers, 'Last-Modified'))
+        meta_file, body_file = self._paths(url)
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._write(body_file, resp.text)
+            self._write(meta_file, json.dumps(asdict(entry)))
+            self._evict()
+
+    def revalidated(self, entry: CacheEntry):
+        """ The server said the cached page is still current (304). """
+        entry.fetched = time.time()
+        meta_file, body_file = self._paths(entry.url)
+        with self._lock:
+            self._write(meta_file, json.dumps(asdict(entry)))
+            body_file.touch()
+
+    def touch(self, url: str):
+        """ Mark the entry as just used. """
+        for path in self._paths(url):
+            try:
+                path.touch()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _write(path: Path, text: str):
+        """ Write atomically, other pyforces processes may be reading it. """
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(text)
+        os.replace(tmp, path)
+
+    def _evict(self):
+        files = [(f.stat(), f) for f in self.cache_dir.glob('*.html')]
+        total = sum(st.st_size for st, _ in files)
+        for st, body_file in sorted(files, key=lambda x: x[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            logger.info("Evicting %s from the HTTP cache", body_file.name)
+            body_file.unlink(missing_ok=True)
+            body_file.with_suffix('.json').unlink(missing_ok=True)
+            total -= st.st_size